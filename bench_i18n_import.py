@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark for i18n start-up cost
+Compares importing utils.i18n with loading the catalog eagerly at import, as before
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+project_dir = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    'interpreter only': "pass",
+    'lazy import (now)': "import utils.i18n",
+    'eager setup (before)': "import utils.i18n; utils.i18n.get_translation()",
+    'first translation': "from utils.i18n import _; _('Ready')",
+}
+
+def run(code, runs):
+    """Return the wall-clock times of starting Python and running code"""
+    times = []
+    for _run in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=project_dir, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    baseline = None
+
+    print(f"{'Scenario':<24} {'median':>10} {'overhead':>10}   ({runs} runs)")
+    for name, code in SCENARIOS.items():
+        median = statistics.median(run(code, runs)) * 1000
+        if baseline is None:
+            baseline = median
+        print(f"{name:<24} {median:>8.1f}ms {median - baseline:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,33 @@ POLICYKIT_FOR_INSTALL = True  # Use PolicyKit for installations
 AUTO_SELECT_ALL_UPDATES = True  # Select all updates by default
 REFRESH_AFTER_INSTALL = True  # Auto-refresh after successful installation
 CACHE_UPDATE_INTERVAL = 3600  # Seconds (1 hour)
+UNPRIVILEGED_REFRESH = True  # Check for updates with user-owned package lists, root only to install
+BACKGROUND_REFRESH_JITTER = 600  # Random delay added to each background refresh (seconds)
+BACKGROUND_REFRESH_ON_BATTERY = False  # Refresh in the background while on battery
+BACKGROUND_REFRESH_ON_METERED = False  # Refresh in the background on metered connections
+
+# Update sources, in installation order; plugins register under the "guideos_updater.backends" entry point
+UPDATE_BACKENDS = ['apt', 'flatpak', 'snap', 'fwupd']
+FWUPDMGR_COMMAND = 'fwupdmgr'  # fwupd client, or a stub printing fixture JSON for testing
+SNAP_COMMAND = 'snap'  # snap client, or a stub printing fixture output for testing
+UNATTENDED_BACKENDS = ['apt']  # Sources of security updates installed by guideos-updater --unattended
+
+# Shared download cache (opt-in, for many machines on one network)
+SHARED_CACHE_ENABLED = False  # Try the shared cache before the mirrors
+SHARED_CACHE_DIR = None  # Local or network-mounted directory, e.g. "/srv/guideos-cache"
+SHARED_CACHE_PEERS = []  # Peer HTTP endpoints, e.g. ["http://192.168.1.10:8080"]
+SHARED_CACHE_PUBLISH = True  # Copy downloaded archives into SHARED_CACHE_DIR
+SHARED_CACHE_TIMEOUT = 5  # Seconds per peer request
+SHARED_CACHE_SERVE = False  # Serve SHARED_CACHE_DIR to peers while running with --background
+SHARED_CACHE_PORT = 8080  # Port of the peer HTTP server
+
+# Package metadata cache
+METADATA_CACHE_MAX_ENTRIES = 5000  # Least recently used entries are evicted beyond this
+METADATA_WORKERS = 4  # Package details looked up in parallel during a refresh
+
+# Metrics (Prometheus textfile collector format, written to LOG_DIR)
+METRICS_ENABLED = True  # Write guideos-updater.prom after every refresh and installation
+METRICS_JSON_SUMMARY = False  # Also write metrics.json
 
 # UI settings
 WINDOW_WIDTH = 800
@@ -0,0 +1,88 @@
+"""
+User-owned APT Lists
+Private copy of the APT package lists that can be refreshed without root
+"""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from utils.logger import Logger
+
+class UserAptLists:
+    """Shadow of /var/lib/apt/lists with its own Dir::State so checks need no privileges"""
+
+    SYSTEM_LISTS_DIR = Path('/var/lib/apt/lists')
+
+    def __init__(self, base_dir=None):
+        self.logger = Logger()
+
+        try:
+            from config import CACHE_DIR
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+
+        self.base_dir = Path(base_dir) if base_dir else CACHE_DIR / 'apt'
+        self.lists_dir = self.base_dir / 'lists'
+        self.cache_dir = self.base_dir / 'cache'
+        self.config_file = self.base_dir / 'apt.conf'
+
+    @property
+    def options(self):
+        """Command line options that make apt tools use the user-owned lists"""
+        self.ensure()
+        return ['-c', str(self.config_file)]
+
+    def ensure(self):
+        """Create the directory layout and configuration on first use"""
+        if self.config_file.exists():
+            return
+
+        for directory in [self.lists_dir / 'partial', self.cache_dir / 'archives' / 'partial']:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        # Start from the system lists so the first update only fetches what changed
+        self.seed()
+
+        # Update hooks in /etc/apt/apt.conf.d expect root, so they are dropped here
+        config = (
+            f'Dir::State::Lists "{self.lists_dir}";\n'
+            f'Dir::Cache "{self.cache_dir}";\n'
+            '#clear APT::Update::Pre-Invoke;\n'
+            '#clear APT::Update::Post-Invoke;\n'
+            '#clear APT::Update::Post-Invoke-Success;\n'
+        )
+        temporary = self.config_file.with_suffix('.tmp')
+        temporary.write_text(config)
+        temporary.replace(self.config_file)
+
+    def seed(self):
+        """Copy the system package lists, keeping their timestamps"""
+        copied = 0
+        try:
+            for entry in self.SYSTEM_LISTS_DIR.iterdir():
+                if entry.is_file() and entry.name != 'lock':
+                    shutil.copy2(entry, self.lists_dir / entry.name)
+                    copied += 1
+        except OSError as e:
+            self.logger.warning(f"Could not copy system package lists: {e}")
+
+        self.logger.info(f"Seeded user package lists with {copied} files from {self.SYSTEM_LISTS_DIR}")
+
+    def update(self):
+        """Download current package lists into the user-owned directory"""
+        try:
+            self.logger.info("Updating user package lists...")
+            result = subprocess.run(['apt-get', 'update', '-q'] + self.options,
+                                  capture_output=True, text=True,
+                                  env=dict(os.environ, LC_ALL='C'))
+
+            if result.returncode == 0:
+                self.logger.info("User package lists updated successfully")
+                return True
+
+            self.logger.error(f"Failed to update user package lists: {result.stderr.strip()}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error updating user package lists: {e}")
+            return False
@@ -7,18 +7,59 @@ import subprocess
 import json
 import re
 import os
-import time
+import shutil
+import threading
 from utils.logger import Logger
 from utils.policykit import PolicyKitManager
-from utils.auth import SudoAuthenticator
+from utils.root_runner import RootRunner
+from .download_cache import DownloadCache
+from .archive_verify import APT_ARCHIVES, import_archives, read_checksums
+from .metadata_cache import MetadataCache
+from .apt_lists import UserAptLists
+from .repo_probe import RepositoryProbe
+from .backends import Backend
+from .pipeline import resolve_pipelined
 
-class APTManager:
+# Moves staged archives into apt's cache after checking them as root
+IMPORT_HELPER = '/usr/lib/guideos-updater/guideos-updater-import-archives'
+
+# Keep changed configuration files without asking when nobody can answer
+CONFFILE_OPTIONS = ['-o', 'Dpkg::Options::=--force-confdef', '-o', 'Dpkg::Options::=--force-confold']
+
+# One line of "apt list --upgradable": name/suite[,suite...] version arch [upgradable from: version]
+UPGRADABLE_LINE = re.compile(r'^(?P<name>[^/\s]+)/(?P<suites>\S+) (?P<version>\S+) (?P<architecture>\S+) '
+                             r'\[upgradable from: (?P<current>[^\]\s]+)\]$')
+
+class CacheUpdate(threading.Thread):
+    """Runs the privileged package cache update next to read-only work"""
+    
+    def __init__(self, apt_manager):
+        super().__init__(daemon=True)
+        self.apt_manager = apt_manager
+        self.success = False
+    
+    def run(self):
+        self.success = self.apt_manager._update_package_cache()
+
+class APTManager(Backend):
     """Manager for APT package operations"""
     
-    def __init__(self, parent_window=None):
+    name = 'apt'
+    label = 'APT'
+    
+    def __init__(self, parent_window=None, metadata_cache=None):
         self.logger = Logger()
         self.policykit = PolicyKitManager()
-        self.authenticator = SudoAuthenticator(parent_window)
+        
+        # Running as root (unattended) needs no password dialog, and so no GTK
+        self.is_root = os.geteuid() == 0
+        if self.is_root:
+            self.authenticator = RootRunner()
+        else:
+            from utils.auth import SudoAuthenticator
+            self.authenticator = SudoAuthenticator(parent_window)
+        self.download_cache = DownloadCache()
+        self.metadata_cache = metadata_cache or MetadataCache()
         
         # Import config settings
         try:
@@ -30,54 +71,77 @@ class APTManager:
             self.use_policykit = self.policykit.is_pkexec_available()
             self.policykit_for_cache = False  # Don't use PolicyKit for cache updates by default
             self.policykit_for_install = True
+        if self.is_root:
+            # pkexec has nothing to do for root
+            self.use_policykit = False
+        
+        # Checks for updates use user-owned package lists, root is only needed to install
+        try:
+            from config import UNPRIVILEGED_REFRESH
+        except ImportError:
+            UNPRIVILEGED_REFRESH = True
+        self.user_lists = UserAptLists() if UNPRIVILEGED_REFRESH and not self.is_root else None
+        
+        # Repository fingerprints as of the last successful update of each set of lists
+        self.user_probe = RepositoryProbe('apt-user')
+        self.system_probe = RepositoryProbe('apt-system')
+        
+        try:
+            from config import METADATA_WORKERS
+        except ImportError:
+            METADATA_WORKERS = 4
+        self.metadata_workers = METADATA_WORKERS
+    
+    @property
+    def capabilities(self):
+        """Features of the APT backend"""
+        capabilities = {'batch-install', 'security', 'preflight', 'recovery', 'streaming'}
+        if not self.user_lists:
+            capabilities.add('privileged-refresh')
+        return frozenset(capabilities)
+    
+    def is_available(self):
+        """Check if APT is available on the system"""
+        return shutil.which('apt-get') is not None
+    
+    def set_parent_window(self, window):
+        """Set the parent window of the password dialog"""
+        self.authenticator.parent_window = window
     
-    def get_updates(self):
-        """Get list of available APT updates"""
+    def update_cache(self):
+        """Update the system package cache"""
+        return self._update_package_cache()
+    
+    def get_updates(self, update_cache=True, found=None):
+        """Get list of available APT updates, passing each record to found as soon as it is known"""
         try:
             self.logger.info("Checking for APT updates...")
             
-            # Always update the package cache first to ensure we have the latest information
-            self.logger.info("Updating APT package cache...")
-            success = self._update_package_cache()
-            
-            if not success:
-                self.logger.error("Failed to update package lists")
-                # Still try to get updates with existing cache
-                self.logger.info("Continuing with existing package cache...")
+            # Update the package cache to ensure we have the latest information. The
+            # user-owned lists need no privileges; the system cache update may wait for
+            # the user's password, so meanwhile list and resolve package details from the
+            # current lists and let the final pass mostly hit the metadata cache.
+            cache_update = None
+            if update_cache and self.user_lists:
+                if not self._update_user_lists():
+                    self.logger.info("Continuing with existing package lists...")
+            elif update_cache:
+                self.logger.info("Updating APT package cache...")
+                cache_update = CacheUpdate(self)
+                cache_update.start()
             
-            # Get list of upgradable packages
-            result = subprocess.run(['apt', 'list', '--upgradable'], 
-                                  capture_output=True, text=True)
+            updates = self._collect_updates(found)
             
-            updates = []
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            
-            for line in lines:
-                if not line.strip():
-                    continue
-                
-                # Parse package info
-                parts = line.split()
-                if len(parts) >= 3:
-                    package_name = parts[0].split('/')[0]
-                    new_version = parts[1]
-                    current_version = parts[5] if len(parts) > 5 else "unknown"
-                    
-                    # Check if it's a security update
-                    is_security = self._is_security_update(package_name)
-                    
-                    update = {
-                        'name': package_name,
-                        'current_version': current_version,
-                        'new_version': new_version,
-                        'source': 'apt',
-                        'type': 'security' if is_security else 'regular',
-                        'is_security': is_security,
-                        'description': self._get_package_description(package_name),
-                        'size': self._get_package_size(package_name)
-                    }
-                    updates.append(update)
+            if cache_update:
+                cache_update.join()
+                if cache_update.success:
+                    updates = self._collect_updates(found)
+                else:
+                    self.logger.error("Failed to update package lists")
+                    # Still use the updates from the existing cache
+                    self.logger.info("Continuing with existing package cache...")
             
+            self.metadata_cache.commit()
             self.logger.info(f"Found {len(updates)} APT updates")
             return updates
             
@@ -88,7 +152,133 @@ class APTManager:
             self.logger.error(f"Unexpected error in APT manager: {e}")
             return []
     
+    def _collect_updates(self, found=None):
+        """List upgradable packages with their details"""
+        # Versions already in the metadata cache are complete at once, the others are
+        # shown right away and resolved by the worker pool while apt is still listing
+        def lookup(entry):
+            metadata = self.metadata_cache.get('apt', entry[0], entry[1])
+            if metadata is None:
+                return self._build_update(*entry, self._placeholder_metadata(entry[0], entry[1])), False
+            return self._build_update(*entry, metadata), True
+        
+        return resolve_pipelined(self._list_upgradable(), lookup, lambda entry: self._make_update(*entry),
+                                 found=found, workers=self.metadata_workers)
+    
+    def _list_upgradable(self):
+        """Yield (name, new version, architecture, current version) of upgradable packages"""
+        # Lines are parsed as apt prints them, so memory does not grow with the list;
+        # the C locale keeps "[upgradable from: ...]" untranslated
+        env = dict(os.environ, LC_ALL='C')
+        with subprocess.Popen(['apt', 'list', '--upgradable'] + self._read_options(),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env) as process:
+            for line in process.stdout:
+                match = UPGRADABLE_LINE.match(line)
+                if match:
+                    yield match.group('name', 'version', 'architecture', 'current')
+    
+    def _make_update(self, package_name, new_version, architecture, current_version):
+        """Build the update record of a package version"""
+        # Package details, from the metadata cache when this version is known
+        metadata = self._get_package_metadata(package_name, new_version)
+        return self._build_update(package_name, new_version, architecture, current_version, metadata)
+    
+    def _build_update(self, package_name, new_version, architecture, current_version, metadata):
+        """Build an update record from a listed package and its metadata"""
+        is_security = self._is_security_update(metadata['origin'])
+        # Archives an earlier run left in apt's cache are not downloaded again
+        cached = metadata['size'] is not None and self._is_archive_cached(
+            package_name, new_version, architecture, metadata['size'])
+        size_bytes = 0 if cached else metadata['size']
+        
+        return {
+            'name': package_name,
+            'current_version': current_version,
+            'new_version': new_version,
+            'architecture': architecture,
+            'source': 'apt',
+            'type': 'security' if is_security else 'regular',
+            'is_security': is_security,
+            'origin': metadata['origin'],
+            'source_package': metadata['source_package'] or package_name,
+            'first_seen': metadata['first_seen'],
+            'description': metadata['description'] or "No description available",
+            'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+            'size_bytes': size_bytes,
+            'cached': cached
+        }
+    
+    def _is_archive_cached(self, package_name, new_version, architecture, size):
+        """Check if the complete archive of a package version is in apt's archive cache"""
+        filename = DownloadCache.archive_filename(
+            {'name': package_name, 'new_version': new_version, 'architecture': architecture})
+        try:
+            return os.stat(os.path.join(APT_ARCHIVES, filename)).st_size == size
+        except OSError:
+            return False
+    
+    def _placeholder_metadata(self, package_name, version):
+        """Metadata of a package version whose details are still being resolved"""
+        return {
+            'description': None,
+            'size': None,
+            'origin': '',
+            'source_package': None,
+            'first_seen': self.metadata_cache.first_seen('apt', package_name, version)
+        }
+    
+    def _read_options(self):
+        """Options for read-only apt commands so they see the same lists as the refresh"""
+        return self.user_lists.options if self.user_lists else []
+    
+    def prepare_install(self):
+        """Bring the system package lists up to date before installing"""
+        # Updates were found in the user-owned lists; root's apt must know the same versions
+        if self.user_lists:
+            return self._update_package_cache()
+        return True
+    
+    def _release_uris(self):
+        """Get the Release/InRelease URIs of all configured repositories"""
+        try:
+            # --print-uris only lists what apt would fetch, without locking or downloading
+            result = subprocess.run(['apt-get', 'update', '--print-uris', '-q'] + self._read_options(),
+                                  capture_output=True, text=True, env=dict(os.environ, LC_ALL='C'))
+            
+            uris = []
+            for line in result.stdout.split('\n'):
+                if line.startswith("'"):
+                    uri = line.split("'")[1]
+                    if uri.endswith(('/InRelease', '/Release')):
+                        uris.append(uri)
+            return uris
+        except Exception as e:
+            self.logger.warning(f"Could not list repository URIs: {e}")
+            return []
+    
+    def _update_user_lists(self):
+        """Update the user-owned package lists unless no repository changed"""
+        if not self.user_probe.check(self._release_uris()):
+            self.logger.info("APT repositories unchanged, skipping package list update")
+            return True
+        
+        success = self.user_lists.update()
+        if success:
+            self.user_probe.commit()
+        return success
+    
     def _update_package_cache(self):
+        """Update the APT package cache unless no repository changed since the last update"""
+        if not self.system_probe.check(self._release_uris()):
+            self.logger.info("APT repositories unchanged, skipping package cache update")
+            return True
+        
+        success = self._run_package_cache_update()
+        if success:
+            self.system_probe.commit()
+        return success
+    
+    def _run_package_cache_update(self):
         """Update the APT package cache"""
         try:
             # Use PolicyKit if specifically enabled for cache updates
@@ -113,89 +303,299 @@ class APTManager:
             self.logger.error(f"Error updating APT cache: {e}")
             return False
     
+    def recover_interrupted(self):
+        """Finish package configuration left over from an interrupted installation"""
+        try:
+            # dpkg --audit needs no root and prints nothing when all packages are consistent
+            audit = subprocess.run(['dpkg', '--audit'], capture_output=True, text=True,
+                                 env=dict(os.environ, LC_ALL='C'))
+            if not audit.stdout.strip():
+                return True
+            
+            self.logger.warning("Packages were left unconfigured, running dpkg --configure -a")
+            if self.use_policykit and self.policykit_for_install:
+                success, output = self.policykit.configure_pending_packages()
+                if not success:
+                    self.logger.warning(f"PolicyKit recovery failed, trying sudo: {output}")
+                    success, output = self.authenticator.run_sudo_command(['dpkg', '--configure', '-a'])
+            else:
+                success, output = self.authenticator.run_sudo_command(['dpkg', '--configure', '-a'])
+            
+            if success:
+                self.logger.info("Interrupted package configuration completed")
+            else:
+                self.logger.error(f"Could not complete package configuration: {output}")
+            return success
+        except Exception as e:
+            self.logger.error(f"Error recovering interrupted installation: {e}")
+            return False
+    
+    def group_by_source(self, updates):
+        """Group APT updates by the source package their binaries were built from"""
+        groups = {}
+        for update in updates:
+            source_package = update.get('source_package') or update['name']
+            groups.setdefault(source_package, []).append(update)
+        
+        result = []
+        for source_package, members in groups.items():
+            sizes = [u['size_bytes'] for u in members if u.get('size_bytes') is not None]
+            size_bytes = sum(sizes) if sizes else None
+            result.append({
+                'name': source_package,
+                'source': 'apt',
+                'updates': members,
+                'is_security': any(u.get('is_security', False) for u in members),
+                'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+                'size_bytes': size_bytes,
+                'cached': all(u.get('cached', False) for u in members)
+            })
+        return result
+    
+    def group_updates(self, updates):
+        """APT updates are shown and installed per source package"""
+        return self.group_by_source(updates)
+    
     def install_update(self, update):
         """Install a specific APT update"""
+        return self.install_updates([update])
+    
+    def install_updates(self, updates, progress=None):
+        """Install several APT updates in a single apt run"""
+        names = ", ".join(update['name'] for update in updates)
         try:
-            self.logger.info(f"Installing APT package: {update['name']}")
+            self.logger.info(f"Installing APT packages: {names}")
             
-            # Try to install the specific version first, then fallback to package name only
+            # Try to install the specific versions first, then fallback to package names only
             attempts = []
             
-            # Attempt 1: Specific version if available
-            if '=' not in update['new_version'] and update['new_version'] != 'unknown':
-                attempts.append(f"{update['name']}={update['new_version']}")
+            # Attempt 1: Specific versions if available
+            versioned = [f"{u['name']}={u['new_version']}"
+                         if '=' not in u['new_version'] and u['new_version'] != 'unknown' else u['name']
+                         for u in updates]
+            plain = [update['name'] for update in updates]
+            if versioned != plain:
+                attempts.append(versioned)
+            
+            # Attempt 2: Just the package names (let APT choose the best versions)
+            attempts.append(plain)
             
-            # Attempt 2: Just the package name (let APT choose the best version)
-            attempts.append(update['name'])
+            # Drop corrupt archives from apt's cache and bring in those of the shared cache, if enabled
+            checksums = self._archive_checksums(updates)
+            imports = self.download_cache.prepare_apt(updates, checksums)
+            if imports and not self._import_archives(imports, checksums):
+                self.logger.warning("Could not import archives into apt's cache, apt downloads them")
+            self.download_cache.clear_staging()
+            options = self.download_cache.apt_options() + (CONFFILE_OPTIONS if self.is_root else [])
             
-            for attempt, package_spec in enumerate(attempts, 1):
-                self.logger.info(f"Installation attempt {attempt}: {package_spec}")
+            for attempt, package_specs in enumerate(attempts, 1):
+                self.logger.info(f"Installation attempt {attempt}: {' '.join(package_specs)}")
                 
                 # Use PolicyKit for installation if enabled
                 if self.use_policykit and self.policykit_for_install:
-                    success, output = self.policykit.install_packages([package_spec])
+                    success, output = self.policykit.install_packages(package_specs, options)
                     if not success:
                         self.logger.warning(f"PolicyKit install failed, trying sudo: {output}")
-                        cmd = ['apt', 'install', '-y', package_spec]
+                        cmd = ['apt', 'install', '-y'] + options + package_specs
                         success, output = self.authenticator.run_sudo_command(cmd)
                 else:
-                    cmd = ['apt', 'install', '-y', package_spec]
+                    cmd = ['apt', 'install', '-y'] + options + package_specs
                     success, output = self.authenticator.run_sudo_command(cmd)
                 
                 if success:
-                    self.logger.info(f"Successfully installed {update['name']}")
+                    self.logger.info(f"Successfully installed {names}")
+                    self.download_cache.publish_apt([DownloadCache.archive_filename(u) for u in updates])
                     return True
                 else:
-                    self.logger.warning(f"Attempt {attempt} failed for {package_spec}: {output}")
+                    self.logger.warning(f"Attempt {attempt} failed for {' '.join(package_specs)}: {output}")
                     if attempt < len(attempts):
                         self.logger.info(f"Trying fallback installation method...")
                     
-            self.logger.error(f"All installation attempts failed for {update['name']}")
+            self.logger.error(f"All installation attempts failed for {names}")
             return False
                 
         except Exception as e:
-            self.logger.error(f"Error installing APT update {update['name']}: {e}")
+            self.logger.error(f"Error installing APT updates {names}: {e}")
             return False
     
-    def _is_security_update(self, package_name):
-        """Check if a package update is security-related"""
+    def simulate_install(self, updates):
+        """Simulate installing all given updates in one apt-get run"""
+        result = {
+            'download_size': 0,
+            'installed_size': 0,
+            'download_path': APT_ARCHIVES,
+            'installed_path': '/usr',
+            'held': [],
+            'removals': [],
+            'errors': []
+        }
+        if not updates:
+            return result
+        
+        specs = [f"{u['name']}={u['new_version']}" if u['new_version'] != 'unknown' else u['name']
+                 for u in updates]
+        env = dict(os.environ, LC_ALL='C')
+        
         try:
-            # Check if package is in security repository
-            result = subprocess.run(['apt-cache', 'policy', package_name], 
-                                  capture_output=True, text=True)
+            # Held packages would make the real installation fail
+            held = subprocess.run(['apt-mark', 'showhold'], capture_output=True, text=True, env=env)
+            held_names = set(held.stdout.split())
+            result['held'] = sorted(held_names & {u['name'] for u in updates})
             
-            return 'security' in result.stdout.lower()
-        except:
-            return False
+            # Resolve the whole selection at once, without locking or root
+            simulation = subprocess.run(['apt-get', '-s', '-o', 'Debug::NoLocking=1', 'install']
+                                      + self._read_options() + specs,
+                                      capture_output=True, text=True, env=env)
+            
+            installs = []
+            for line in simulation.stdout.split('\n'):
+                match = re.match(r'^Inst (\S+) (?:\[(\S+)\] )?\((\S+) ', line)
+                if match:
+                    installs.append(match.groups())
+                elif line.startswith('Remv '):
+                    result['removals'].append(line.split()[1])
+            
+            for line in (simulation.stdout + simulation.stderr).split('\n'):
+                # Errors and the unmet dependency report ("foo : Depends: bar ...")
+                if line.startswith('E: ') or re.match(r'^\s+\S+ : (?:(?:Pre-)?Depends|Breaks|Conflicts):', line):
+                    result['errors'].append(line.strip())
+            if simulation.returncode != 0 and not result['errors']:
+                result['errors'].append(simulation.stderr.strip() or "apt-get simulation failed")
+            
+            download, installed = self._get_install_sizes(installs, env)
+            result['download_size'] = download
+            result['installed_size'] = installed
+        except Exception as e:
+            self.logger.error(f"Error simulating APT installation: {e}")
+            result['errors'].append(str(e))
+        
+        return result
+    
+    def _get_install_sizes(self, installs, env):
+        """Get download size and installed size change for simulated installs"""
+        if not installs:
+            return 0, 0
+        
+        # New versions: one apt-cache call for all records
+        result = subprocess.run(['apt-cache', 'show'] + self._read_options()
+                              + [f"{name}={new}" for name, _old, new in installs],
+                              capture_output=True, text=True, env=env)
+        download = 0
+        installed = 0
+        seen = set()
+        for stanza in result.stdout.split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in stanza.split('\n') if ': ' in line and not line.startswith(' '))
+            key = (fields.get('Package'), fields.get('Version'))
+            if key in seen:
+                continue
+            seen.add(key)
+            download += int(fields.get('Size', 0))
+            installed += int(fields.get('Installed-Size', 0)) * 1024
+        
+        # Currently installed versions are replaced
+        upgraded = [name for name, old, _new in installs if old]
+        if upgraded:
+            result = subprocess.run(['dpkg-query', '-W', '-f=${Installed-Size}\n'] + upgraded,
+                                  capture_output=True, text=True, env=env)
+            installed -= sum(int(size) * 1024 for size in result.stdout.split() if size.isdigit())
+        
+        return download, installed
+    
+    def _is_security_update(self, origin):
+        """Check if a package update is security-related"""
+        return 'security' in (origin or '').lower()
     
-    def _get_package_description(self, package_name):
-        """Get package description"""
+    def _get_package_metadata(self, package_name, version):
+        """Get description, download size and origin of a package version"""
+        metadata = self.metadata_cache.get('apt', package_name, version)
+        if metadata is not None:
+            return metadata
+        
+        # One apt-cache record lookup serves both description and size
+        record = self._get_package_record(package_name, version)
+        description = record.get('Description') or record.get('Description-en')
         try:
-            result = subprocess.run(['apt-cache', 'show', package_name], 
+            size = int(record['Size'])
+        except (KeyError, ValueError):
+            size = None
+        # "Source: name (version)" is only present when it differs from the binary package
+        source_package = record.get('Source', package_name).split(' ', 1)[0] or package_name
+        origin = self._get_package_origin(package_name, version)
+        first_seen = self.metadata_cache.put('apt', package_name, version,
+                                             description=description, size=size, origin=origin,
+                                             source_package=source_package)
+        
+        return {
+            'description': description,
+            'size': size,
+            'origin': origin,
+            'source_package': source_package,
+            'first_seen': first_seen
+        }
+    
+    def _get_package_record(self, package_name, version):
+        """Get the apt-cache record of a package version as a dict"""
+        record = {}
+        try:
+            result = subprocess.run(['apt-cache', 'show', f"{package_name}={version}"] + self._read_options(), 
                                   capture_output=True, text=True)
             
             for line in result.stdout.split('\n'):
-                if line.startswith('Description:'):
-                    return line.split(':', 1)[1].strip()
-            
-            return "No description available"
-        except:
-            return "No description available"
+                if not line.strip():
+                    break  # Only the first stanza
+                if ':' in line and not line.startswith(' '):
+                    key, value = line.split(':', 1)
+                    record[key] = value.strip()
+        except Exception as e:
+            self.logger.warning(f"Could not read package record for {package_name}: {e}")
+        
+        return record
     
-    def _get_package_size(self, package_name):
-        """Get package download size"""
+    def _archive_checksums(self, updates):
+        """Get {archive file name: (size, sha256)} of the given updates from the package index"""
+        specs = [f"{u['name']}={u['new_version']}" for u in updates if u['new_version'] != 'unknown']
+        return read_checksums(specs, self._read_options())
+    
+    def _import_archives(self, filenames, checksums):
+        """Let root verify staged archives into apt's cache and delete corrupt ones there"""
+        staging_dir = str(self.download_cache.staging_dir)
+        if self.is_root:
+            import_archives(staging_dir, filenames, checksums)
+            return True
+        if not os.path.exists(IMPORT_HELPER):
+            self.logger.warning(f"{IMPORT_HELPER} is not installed")
+            return False
+        
+        # The helper reads the checksums from root's package index itself
+        cmd = [IMPORT_HELPER, staging_dir] + filenames
+        if self.use_policykit and self.policykit_for_install:
+            success, output = self.policykit.run_with_pkexec('org.guideos.guideos-updater', cmd)
+            if success:
+                return True
+            self.logger.warning(f"PolicyKit archive import failed, trying sudo: {output}")
+        success, output = self.authenticator.run_sudo_command(cmd)
+        return success
+    
+    def _get_package_origin(self, package_name, version):
+        """Get the repositories a package version is available from"""
         try:
-            result = subprocess.run(['apt-cache', 'show', package_name], 
+            result = subprocess.run(['apt-cache', 'policy', package_name] + self._read_options(), 
                                   capture_output=True, text=True)
             
+            # Collect the source lines listed under the version in the version table
+            origins = []
+            in_version = False
             for line in result.stdout.split('\n'):
-                if line.startswith('Size:'):
-                    size_bytes = int(line.split(':', 1)[1].strip())
-                    return self._format_size(size_bytes)
+                match = re.match(r'^ (?:\*\*\*| {3}) (\S+) -?\d+$', line)
+                if match:
+                    in_version = match.group(1) == version
+                elif in_version and line.strip():
+                    origins.append(line.split(None, 1)[-1])
             
-            return "Unknown"
-        except:
-            return "Unknown"
+            return ', '.join(origins)
+        except Exception as e:
+            self.logger.warning(f"Could not read package policy for {package_name}: {e}")
+            return ''
     
     def _format_size(self, bytes_size):
         """Format size in human readable format"""
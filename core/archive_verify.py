@@ -0,0 +1,171 @@
+"""
+Archive Verification
+Checks package archives on disk against the SHA256 sums of the package index
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import stat
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.logger import Logger
+
+# Downloaded archives, kept by apt until it cleans its cache
+APT_ARCHIVES = '/var/cache/apt/archives'
+
+def archive_name(name, version, architecture):
+    """Get the file name apt uses for the archive of a package version"""
+    # apt escapes the epoch separator in archive file names
+    return f"{name}_{version.replace(':', '%3a')}_{architecture}.deb"
+
+def package_spec(filename):
+    """Get the apt-cache version spec of an archive file name, None if it is not one"""
+    parts = filename[:-len('.deb')].split('_') if filename.endswith('.deb') else []
+    if len(parts) != 3 or '/' in filename:
+        return None
+    name, version, architecture = parts
+    version = version.replace('%3a', ':')
+    return f"{name}={version}" if architecture == 'all' else f"{name}:{architecture}={version}"
+
+def read_checksums(specs, options=()):
+    """Get {archive file name: (size, sha256)} of package versions from the package index"""
+    checksums = {}
+    if not specs:
+        return checksums
+    try:
+        # One apt-cache call prints a record per requested version
+        result = subprocess.run(['apt-cache', 'show'] + list(options) + list(specs),
+                                capture_output=True, text=True, env=dict(os.environ, LC_ALL='C'))
+    except OSError as e:
+        Logger().warning(f"Could not read archive checksums: {e}")
+        return checksums
+
+    for stanza in result.stdout.split('\n\n'):
+        record = {}
+        for line in stanza.split('\n'):
+            if ':' in line and not line.startswith(' '):
+                key, value = line.split(':', 1)
+                record[key] = value.strip()
+        try:
+            filename = archive_name(record['Package'], record['Version'], record['Architecture'])
+            checksums[filename] = (int(record['Size']), record['SHA256'])
+        except (KeyError, ValueError):
+            continue
+    return checksums
+
+def sha256_file(path):
+    """Hash a file through a memory map, without copying it into Python memory"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+class ArchiveVerifier:
+    """Verifies several archives at once; hashlib releases the GIL, so threads use all cores"""
+
+    def __init__(self, workers=None):
+        self.logger = Logger()
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def index(directory):
+        """Get {file name: size} of the archives in a directory with one directory read"""
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name: entry.stat().st_size for entry in entries
+                        if entry.name.endswith('.deb') and entry.is_file()}
+        except OSError:
+            return {}
+
+    def verify(self, files):
+        """Check {path: (size, sha256)}, returning {path: True if the file matches}"""
+        def matches(item):
+            path, (size, checksum) = item
+            try:
+                # A wrong size is found without reading the file
+                if os.stat(path).st_size != size:
+                    return False
+                return sha256_file(path) == checksum
+            except OSError as e:
+                self.logger.warning(f"Could not verify {path}: {e}")
+                return False
+
+        items = list(files.items())
+        if not items:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+            results = dict(zip((path for path, _ in items), pool.map(matches, items)))
+
+        corrupt = [os.path.basename(path) for path, ok in results.items() if not ok]
+        if corrupt:
+            self.logger.warning(f"{len(corrupt)} cached archives do not match the package index: "
+                                f"{', '.join(corrupt[:5])}")
+        return results
+
+def _copy_regular_file(source, target):
+    """Copy a file without following symlinks or reading anything but a regular file"""
+    fd = os.open(source, os.O_RDONLY | os.O_NOFOLLOW)
+    with os.fdopen(fd, 'rb') as src:
+        if not stat.S_ISREG(os.fstat(src.fileno()).st_mode):
+            raise OSError(f"{source} is not a regular file")
+        with open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.chmod(target, 0o644)
+
+def import_archives(staging_dir, filenames, checksums, archives_dir=APT_ARCHIVES):
+    """Move staged archives into apt's cache as root, verifying the copies apt will read
+
+    Corrupt archives already in apt's cache are deleted first. The staging
+    directory belongs to the user, so each archive is copied into apt's
+    root-owned partial directory and checked there, where it can no longer
+    be swapped. Archives without a known checksum are never imported.
+    Returns the number of imported archives.
+    """
+    logger = Logger()
+    verifier = ArchiveVerifier()
+    staging_dir, archives_dir = Path(staging_dir), Path(archives_dir)
+    partial = archives_dir / 'partial'
+    names = [name for name in filenames if name in checksums and package_spec(name)]
+
+    # apt only compares the size of archives in its cache
+    existing = {archives_dir / name: checksums[name] for name in names if (archives_dir / name).is_file()}
+    for path, ok in verifier.verify(existing).items():
+        if not ok:
+            path.unlink()
+
+    partial.mkdir(parents=True, exist_ok=True)
+    copies = {}
+    for name in names:
+        if (archives_dir / name).exists():
+            continue
+        try:
+            _copy_regular_file(staging_dir / name, partial / name)
+            copies[partial / name] = checksums[name]
+        except OSError as e:
+            logger.debug(f"Not importing {name}: {e}")
+
+    imported = 0
+    for path, ok in verifier.verify(copies).items():
+        if ok:
+            os.replace(path, archives_dir / path.name)
+            imported += 1
+        else:
+            path.unlink()
+    logger.info(f"Imported {imported} of {len(copies)} staged archives into {archives_dir}")
+    return imported
+
+def main():
+    """Import staged archives, run as root by guideos-updater-import-archives"""
+    if len(sys.argv) < 2:
+        print("Usage: guideos-updater-import-archives STAGING_DIR ARCHIVE...", file=sys.stderr)
+        return 2
+    staging_dir, filenames = sys.argv[1], sys.argv[2:]
+    # The checksums come from root's package index, nothing the caller passes is trusted
+    specs = [spec for spec in map(package_spec, filenames) if spec]
+    import_archives(staging_dir, filenames, read_checksums(specs))
+    return 0
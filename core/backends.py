@@ -0,0 +1,143 @@
+"""
+Update Backends
+Common interface of update sources and a registry that imports them on demand
+
+A backend is created with the keyword arguments parent_window and metadata_cache
+and returns update records (dicts) whose 'source' is the backend's name and whose
+'size_bytes' estimates what has to be downloaded (None if unknown). Besides
+the built-in backends, packages can register classes under the entry point group
+"guideos_updater.backends".
+
+Capabilities advertised by backends:
+    batch-install       install_updates() handles several updates in one run
+    security            updates can be flagged as security updates
+    preflight           simulate_install() reports sizes and conflicts
+    progress            install_updates() reports progress within a batch
+    recovery            recover_interrupted() repairs an interrupted installation
+    privileged-refresh  updating the metadata needs root, avoid it unattended
+    streaming           get_updates(found=...) passes records on before the refresh ends
+"""
+
+import abc
+import importlib
+from utils.logger import Logger
+
+ENTRY_POINT_GROUP = 'guideos_updater.backends'
+
+# Built-in backends as "module:Class", imported only when enabled
+BUILTIN_BACKENDS = {
+    'apt': 'core.apt_manager:APTManager',
+    'flatpak': 'core.flatpak_manager:FlatpakManager',
+    'fwupd': 'core.fwupd_manager:FwupdManager',
+    'snap': 'core.snap_manager:SnapManager',
+}
+
+class Backend(abc.ABC):
+    """Base class for update sources; subclasses must implement get_updates and install_update"""
+
+    # Source name stored in update records and display label
+    name = None
+    label = None
+    capabilities = frozenset()
+
+    def is_available(self):
+        """Check if the backend can work on this system"""
+        return True
+
+    def set_parent_window(self, window):
+        """Set the window authentication dialogs belong to"""
+
+    @abc.abstractmethod
+    def get_updates(self, update_cache=True):
+        """Get available updates, refreshing the metadata first if update_cache is set"""
+
+    def update_cache(self):
+        """Refresh the backend's metadata"""
+        return True
+
+    def prepare_install(self):
+        """Get ready to install updates found by get_updates"""
+        return True
+
+    def recover_interrupted(self):
+        """Repair what an interrupted installation left behind"""
+        return True
+
+    def group_updates(self, updates):
+        """Group updates that are shown and installed together; by default each on its own"""
+        return [{
+            'name': update['name'],
+            'source': update['source'],
+            'updates': [update],
+            'is_security': update.get('is_security', False),
+            'size': update.get('size', 'Unknown'),
+            'size_bytes': update.get('size_bytes')
+        } for update in updates]
+
+    def simulate_install(self, updates):
+        """Estimate sizes and find problems before installing"""
+        return {
+            'download_size': 0,
+            'installed_size': 0,
+            'installed_path': '/',
+            'errors': []
+        }
+
+    @abc.abstractmethod
+    def install_update(self, update):
+        """Install one update"""
+
+    def install_updates(self, updates, progress=None):
+        """Install updates, calling progress(fraction, name) as they complete"""
+        success = True
+        for index, update in enumerate(updates, 1):
+            success = self.install_update(update) and success
+            if progress:
+                progress(index / len(updates), update['name'])
+        return success
+
+class BackendRegistry:
+    """Finds backend classes by name without importing the ones that are not used"""
+
+    def __init__(self):
+        self.logger = Logger()
+        self._entry_points = None
+
+    def available(self):
+        """Names of all known backends"""
+        return sorted(set(BUILTIN_BACKENDS) | set(self._plugins()))
+
+    def load(self, names, **context):
+        """Create the named backends that are available on this system"""
+        backends = {}
+        for name in names:
+            try:
+                backend = self.resolve(name)(**context)
+            except Exception as e:
+                self.logger.error(f"Could not load update backend '{name}': {e}")
+                continue
+
+            if backend.is_available():
+                backends[name] = backend
+            else:
+                self.logger.info(f"Update backend '{name}' is not available on this system")
+        return backends
+
+    def resolve(self, name):
+        """Import and return the class of a backend"""
+        if name in BUILTIN_BACKENDS:
+            module_name, class_name = BUILTIN_BACKENDS[name].split(':')
+            return getattr(importlib.import_module(module_name), class_name)
+
+        plugins = self._plugins()
+        if name not in plugins:
+            raise LookupError(f"unknown backend, available: {', '.join(self.available())}")
+        return plugins[name].load()
+
+    def _plugins(self):
+        """Entry points of installed plugin backends, read once"""
+        if self._entry_points is None:
+            # Reading package metadata is slow, so only done when a plugin is asked for
+            from importlib.metadata import entry_points
+            self._entry_points = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+        return self._entry_points
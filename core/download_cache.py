@@ -0,0 +1,254 @@
+"""
+Shared Download Cache
+Lets machines on the same network share downloaded package archives
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import urllib.error
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote
+from utils.logger import Logger
+from .archive_verify import ArchiveVerifier, APT_ARCHIVES, archive_name
+
+class DownloadCache:
+    """Opt-in archive cache backed by a local directory and/or peer HTTP endpoints"""
+
+    def __init__(self, enabled=None, cache_dir=None, peers=None, publish=None, staging_dir=None):
+        self.logger = Logger()
+
+        # Import config settings, explicit arguments take precedence
+        try:
+            from config import (SHARED_CACHE_ENABLED, SHARED_CACHE_DIR, SHARED_CACHE_PEERS,
+                                SHARED_CACHE_PUBLISH, SHARED_CACHE_TIMEOUT, SHARED_CACHE_SERVE,
+                                SHARED_CACHE_PORT, CACHE_DIR)
+        except ImportError:
+            SHARED_CACHE_ENABLED, SHARED_CACHE_DIR, SHARED_CACHE_PEERS = False, None, []
+            SHARED_CACHE_PUBLISH, SHARED_CACHE_TIMEOUT = False, 5
+            SHARED_CACHE_SERVE, SHARED_CACHE_PORT = False, 8080
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+
+        self.enabled = SHARED_CACHE_ENABLED if enabled is None else enabled
+        cache_dir = SHARED_CACHE_DIR if cache_dir is None else cache_dir
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.peers = [p.rstrip('/') for p in (SHARED_CACHE_PEERS if peers is None else peers)]
+        self.publish = SHARED_CACHE_PUBLISH if publish is None else publish
+        self.timeout = SHARED_CACHE_TIMEOUT
+        self.serve_enabled = SHARED_CACHE_SERVE
+        self.port = SHARED_CACHE_PORT
+
+        # Archives from the shared cache wait here until root imports them into apt's cache
+        self.staging_dir = Path(staging_dir) if staging_dir else CACHE_DIR / 'archives'
+        self.system_dir = Path(APT_ARCHIVES)
+        self.verifier = ArchiveVerifier()
+
+    @staticmethod
+    def archive_filename(update):
+        """Get the file name apt uses for the archive of an update"""
+        return archive_name(update['name'], update['new_version'], update.get('architecture', 'all'))
+
+    def prepare_apt(self, updates, checksums=None):
+        """Check apt's cache and stage archives from the shared cache for the given APT updates
+
+        checksums maps archive file names to (size, sha256) from the package index.
+        Returns the file names import_archives has to handle as root: verified
+        staged archives and corrupt ones in apt's cache. Anything else apt reuses
+        or downloads itself.
+        """
+        checksums = checksums or {}
+        filenames = [self.archive_filename(update) for update in updates]
+        system_index = self.verifier.index(self.system_dir)
+
+        # apt reuses archives in its cache when only the size matches, so a corrupt one would reach dpkg
+        system = self.verifier.verify({self.system_dir / name: checksums[name] for name in filenames
+                                       if name in system_index and name in checksums})
+        corrupt = [name for name in filenames if system.get(self.system_dir / name) is False]
+        if corrupt:
+            self.logger.warning(f"{len(corrupt)} archives in apt's cache are corrupt")
+
+        staged = []
+        if self.enabled:
+            # Archives without a checksum cannot be verified, not even by apt
+            missing = [name for name in filenames
+                       if name in checksums and system.get(self.system_dir / name) is not True]
+            try:
+                staged = self._stage(missing, checksums)
+            except OSError as e:
+                self.logger.warning(f"Could not prepare shared cache, using mirrors only: {e}")
+            self.logger.info(f"Shared cache provided {len(staged)} of {len(updates)} APT archives")
+
+        return [name for name in filenames if name in staged or name in corrupt]
+
+    def _stage(self, filenames, checksums):
+        """Fetch archives into the staging directory, keeping only those matching the package index"""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        staged_index = self.verifier.index(self.staging_dir)
+
+        candidates = {}
+        for filename in filenames:
+            target = self.staging_dir / filename
+            if filename in staged_index or self.fetch(filename, target):
+                candidates[target] = checksums[filename]
+
+        # Peers are not trusted; root checks the archives again when importing them
+        staged = []
+        for path, ok in self.verifier.verify(candidates).items():
+            if ok:
+                staged.append(path.name)
+            else:
+                self._remove(path)
+        return staged
+
+    def apt_options(self):
+        """Extra apt options, keeping downloaded archives when they are published afterwards"""
+        if self.enabled and self.publish and self.cache_dir:
+            return ['-o', 'APT::Keep-Downloaded-Packages=true']
+        return []
+
+    def clear_staging(self):
+        """Delete everything staged; once imported into apt's cache the copies are not needed"""
+        removed = 0
+        for path in self.staging_dir.glob('*.deb*'):
+            removed += self._remove(path)
+        # Left over from the time apt downloaded into the staging directory
+        for path in (self.staging_dir / 'partial').glob('*'):
+            removed += self._remove(path)
+        if removed:
+            self.logger.debug(f"Removed {removed} staged archives")
+        return removed
+
+    def _remove(self, path):
+        """Delete a file, False if that is not allowed"""
+        try:
+            Path(path).unlink(missing_ok=True)
+            return True
+        except OSError:
+            return False
+
+    def fetch(self, filename, destination):
+        """Fetch an archive from the local cache directory or a peer"""
+        destination = Path(destination)
+
+        # Local (or network-mounted) cache directory first
+        if self.cache_dir:
+            source = self.cache_dir / filename
+            if source.is_file():
+                try:
+                    shutil.copyfile(source, destination)
+                    self.logger.info(f"Using {filename} from {self.cache_dir}")
+                    return True
+                except OSError as e:
+                    self.logger.warning(f"Could not copy {source}: {e}")
+
+        # Then ask the peers
+        for peer in self.peers:
+            url = f"{peer}/{quote(filename)}"
+            partial_file = destination.with_name(destination.name + '.part')
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout) as response, \
+                        open(partial_file, 'wb') as f:
+                    shutil.copyfileobj(response, f)
+                os.replace(partial_file, destination)
+                self.logger.info(f"Fetched {filename} from peer {peer}")
+                return True
+            except (urllib.error.URLError, OSError) as e:
+                self.logger.debug(f"Peer {peer} does not have {filename}: {e}")
+                try:
+                    partial_file.unlink()
+                except FileNotFoundError:
+                    pass
+
+        return False
+
+    def publish_apt(self, filenames):
+        """Copy the given archives from apt's cache into the shared cache directory"""
+        if not (self.enabled and self.publish and self.cache_dir):
+            return 0
+
+        published = 0
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for filename in filenames:
+                archive = self.system_dir / filename
+                target = self.cache_dir / filename
+                if target.exists() or not archive.is_file():
+                    continue
+
+                # Copy under a temporary name so readers never see partial files
+                temporary = target.with_name(target.name + '.part')
+                shutil.copyfile(archive, temporary)
+                os.replace(temporary, target)
+                published += 1
+
+            if published:
+                self.logger.info(f"Published {published} archives to {self.cache_dir}")
+        except OSError as e:
+            self.logger.warning(f"Could not publish archives to {self.cache_dir}: {e}")
+
+        return published
+
+    def flatpak_options(self):
+        """Get extra flatpak options to pull from the shared sideload repository"""
+        if not (self.enabled and self.cache_dir):
+            return []
+
+        repo = self.cache_dir / 'flatpak' / '.ostree' / 'repo'
+        if not repo.is_dir():
+            return []
+        return [f'--sideload-repo={repo}']
+
+    def publish_flatpak(self, app_id):
+        """Export an updated Flatpak into the shared sideload repository"""
+        if not (self.enabled and self.publish and self.cache_dir):
+            return False
+
+        try:
+            target = self.cache_dir / 'flatpak'
+            target.mkdir(parents=True, exist_ok=True)
+            result = subprocess.run(['flatpak', 'create-usb', '--allow-partial', str(target), app_id],
+                                  capture_output=True, text=True)
+            if result.returncode == 0:
+                self.logger.info(f"Published {app_id} to {target}")
+                return True
+
+            # Remotes without a collection ID cannot be sideloaded
+            self.logger.warning(f"Could not publish {app_id}: {result.stderr.strip()}")
+            return False
+        except Exception as e:
+            self.logger.warning(f"Could not publish {app_id}: {e}")
+            return False
+
+    def serve(self, port=8080, bind=''):
+        """Create an HTTP server that shares the cache directory with peers"""
+        if not self.cache_dir:
+            raise ValueError("SHARED_CACHE_DIR is not configured")
+
+        handler = partial(SimpleHTTPRequestHandler, directory=str(self.cache_dir))
+        server = ThreadingHTTPServer((bind, port), handler)
+        self.logger.info(f"Serving {self.cache_dir} on port {server.server_address[1]}")
+        return server
+
+    def start_server(self):
+        """Serve the cache directory from a background thread if SHARED_CACHE_SERVE is set
+
+        Returns the running server, to be shut down by the caller, or None.
+        """
+        if not (self.enabled and self.serve_enabled and self.cache_dir):
+            return None
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            server = self.serve(port=self.port)
+        except OSError as e:
+            self.logger.warning(f"Could not share {self.cache_dir} with peers: {e}")
+            return None
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
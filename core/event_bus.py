@@ -0,0 +1,102 @@
+"""
+Event Bus
+Delivers update manager events from worker threads to subscribers
+"""
+
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+def _freeze(value):
+    """Deep read-only copy: mappings become proxies over copies, lists become tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    """Deep mutable copy of a frozen value"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+def snapshot(updates):
+    """Get an immutable copy of an update list that is safe to hand to other threads"""
+    return tuple(_freeze(update) for update in updates)
+
+def thaw(updates):
+    """Get a mutable copy of an update list, e.g. to work on or to serialize it"""
+    return [_thaw(update) for update in updates]
+
+class GLibDispatcher:
+    """Runs callbacks on the GLib main loop"""
+
+    def __init__(self):
+        # Imported here so headless users never load GLib
+        from gi.repository import GLib
+        self._idle_add = GLib.idle_add
+
+    def dispatch(self, callback, *args):
+        """Queue callback to run on the main loop"""
+        self._idle_add(self._run_once, callback, args)
+
+    @staticmethod
+    def _run_once(callback, args):
+        callback(*args)
+        return False  # Never repeat, whatever the callback returns
+
+class DirectDispatcher:
+    """Runs callbacks immediately in the emitting thread, for headless use"""
+
+    def dispatch(self, callback, *args):
+        """Run callback right away"""
+        callback(*args)
+
+class EventBus:
+    """Thread-safe publish/subscribe with coalescing of high-frequency events"""
+
+    def __init__(self, events, dispatcher=None, coalesce=()):
+        self.dispatcher = dispatcher or GLibDispatcher()
+        self._lock = threading.Lock()
+        self._subscribers = {event: [] for event in events}
+        self._coalesce = set(coalesce)
+        self._pending = {}
+
+    def subscribe(self, event, callback):
+        """Add callback for an event, unknown events are ignored"""
+        with self._lock:
+            if event in self._subscribers:
+                self._subscribers[event].append(callback)
+
+    def emit(self, event, *args):
+        """Deliver an event to all subscribers through the dispatcher"""
+        with self._lock:
+            callbacks = tuple(self._subscribers.get(event, ()))
+            if not callbacks:
+                return
+
+            if event in self._coalesce:
+                # Only the latest arguments matter; one delivery is queued at a time
+                already_queued = event in self._pending
+                self._pending[event] = args
+                if already_queued:
+                    return
+
+        if event in self._coalesce:
+            self.dispatcher.dispatch(self._flush, event)
+        else:
+            for callback in callbacks:
+                self.dispatcher.dispatch(callback, *args)
+
+    def _flush(self, event):
+        """Deliver the latest arguments of a coalesced event"""
+        with self._lock:
+            args = self._pending.pop(event, None)
+            callbacks = tuple(self._subscribers.get(event, ()))
+
+        if args is not None:
+            for callback in callbacks:
+                callback(*args)
@@ -3,17 +3,44 @@ Flatpak Package Manager Interface
 Handles Flatpak application operations and updates
 """
 
+import os
 import subprocess
 import json
 from utils.logger import Logger
+from .download_cache import DownloadCache
+from .metadata_cache import MetadataCache
+from .repo_probe import RepositoryProbe
+from .backends import Backend
 
-class FlatpakManager:
+# Where flatpak keeps the system-wide installation
+SYSTEM_INSTALLATION = '/var/lib/flatpak'
+
+def installation_path(installation):
+    """Get the directory of a flatpak installation ('user', 'system' or a custom name)"""
+    if installation == 'user':
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        return os.environ.get('FLATPAK_USER_DIR') or os.path.join(data_home, 'flatpak')
+    # Custom installations from /etc/flatpak/installations.d are counted as system-wide
+    return os.environ.get('FLATPAK_SYSTEM_DIR') or SYSTEM_INSTALLATION
+
+class FlatpakManager(Backend):
     """Manager for Flatpak package operations"""
     
-    def __init__(self):
+    name = 'flatpak'
+    label = 'Flatpak'
+    capabilities = frozenset({'preflight'})
+    
+    def __init__(self, metadata_cache=None, parent_window=None):
         self.logger = Logger()
+        self.download_cache = DownloadCache()
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.repo_probe = RepositoryProbe('flatpak')
+    
+    def is_available(self):
+        """Check if Flatpak is available on the system"""
+        return self._is_flatpak_available()
     
-    def get_updates(self):
+    def get_updates(self, update_cache=True):
         """Get list of available Flatpak updates"""
         try:
             self.logger.info("Checking for Flatpak updates...")
@@ -23,16 +50,23 @@ class FlatpakManager:
                 self.logger.info("Flatpak is not installed or available")
                 return []
             
-            # Update Flatpak repositories
-            subprocess.run(['flatpak', 'update', '--appstream'], 
-                         capture_output=True, check=True)
+            # Update Flatpak repositories, unless no remote summary changed
+            if update_cache:
+                if self.repo_probe.check(self._summary_urls()):
+                    subprocess.run(['flatpak', 'update', '--appstream'], 
+                                 capture_output=True, check=True)
+                    self.repo_probe.commit()
+                else:
+                    self.logger.info("Flatpak remotes unchanged, skipping appstream update")
             
             # Get list of available updates
-            result = subprocess.run(['flatpak', 'remote-ls', '--updates', '--columns=application,name,version,branch,origin'], 
+            result = subprocess.run(['flatpak', 'remote-ls', '--updates',
+                                     '--columns=application,name,version,branch,origin,download-size,commit'], 
                                   capture_output=True, text=True)
             
             updates = []
             lines = result.stdout.strip().split('\n')
+            installed = self._get_installed()
             
             for line in lines:
                 if not line.strip():
@@ -45,9 +79,19 @@ class FlatpakManager:
                     version = parts[2]
                     branch = parts[3]
                     origin = parts[4]
+                    commit = parts[6] if len(parts) >= 7 else ''
+                    
+                    # Get current version and the installation the app is in
+                    current_version, installation = installed.get((app_id, branch), ("Unknown", 'system'))
                     
-                    # Get current version
-                    current_version = self._get_current_version(app_id)
+                    # App details, from the metadata cache when this commit is known. Many refs,
+                    # runtimes above all, have no version, so the version alone does not tell commits apart.
+                    metadata = self._get_app_metadata(app_id, self._cache_version(version, commit), origin)
+                    # The remote lists the compressed size of the new commit. A static delta can
+                    # be smaller, but flatpak does not tell before pulling, so this is an upper bound.
+                    size_bytes = self._parse_size(parts[5]) if len(parts) >= 6 else None
+                    if size_bytes is None:
+                        size_bytes = metadata['size']
                     
                     update = {
                         'name': app_name,  # Display name for UI
@@ -59,11 +103,16 @@ class FlatpakManager:
                         'is_security': False,
                         'branch': branch,
                         'origin': origin,
-                        'description': self._get_app_description(app_id),
-                        'size': self._get_app_size(app_id, version)
+                        'commit': commit,
+                        'installation': installation,
+                        'first_seen': metadata['first_seen'],
+                        'description': metadata['description'] or "No description available",
+                        'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+                        'size_bytes': size_bytes
                     }
                     updates.append(update)
             
+            self.metadata_cache.commit()
             self.logger.info(f"Found {len(updates)} Flatpak updates")
             return updates
             
@@ -81,11 +130,12 @@ class FlatpakManager:
             
             # Use app_id for the actual flatpak command, not the display name
             app_identifier = update.get('app_id', update['name'])
-            cmd = ['flatpak', 'update', '-y', app_identifier]
+            cmd = ['flatpak', 'update', '-y'] + self.download_cache.flatpak_options() + [app_identifier]
             result = subprocess.run(cmd, capture_output=True, text=True)
             
             if result.returncode == 0:
                 self.logger.info(f"Successfully updated {update['name']} ({app_identifier})")
+                self.download_cache.publish_flatpak(app_identifier)
                 return True
             else:
                 self.logger.error(f"Failed to update {update['name']} ({app_identifier}): {result.stderr}")
@@ -96,6 +146,64 @@ class FlatpakManager:
             self.logger.error(f"Error installing Flatpak update {update['name']} ({app_identifier}): {e}")
             return False
     
+    def simulate_install(self, updates):
+        """Estimate download and installed size of the given updates in one call"""
+        result = {
+            'download_size': 0,
+            'installed_size': 0,
+            'installed_path': installation_path('system'),
+            'installed_paths': {},
+            'errors': []
+        }
+        if not updates:
+            return result
+        
+        try:
+            # flatpak has no dry-run for updates; the remote summary carries the sizes
+            listing = subprocess.run(['flatpak', 'remote-ls', '--updates',
+                                      '--columns=application,download-size,installed-size'],
+                                   capture_output=True, text=True)
+            
+            sizes = {}
+            for line in listing.stdout.split('\n'):
+                parts = line.split('\t')
+                if len(parts) >= 3:
+                    sizes[parts[0]] = (self._parse_size(parts[1]) or 0, self._parse_size(parts[2]) or 0)
+            
+            paths = result['installed_paths']
+            for update in updates:
+                download, installed = sizes.get(update.get('app_id', update['name']), (0, 0))
+                result['download_size'] += download
+                result['installed_size'] += installed
+                # Apps installed with --user pull into the home directory
+                path = installation_path(update.get('installation', 'system'))
+                paths[path] = paths.get(path, 0) + download + installed
+            if paths:
+                result['installed_path'] = max(paths, key=paths.get)
+        except Exception as e:
+            self.logger.error(f"Error simulating Flatpak updates: {e}")
+            result['errors'].append(str(e))
+        
+        return result
+    
+    def _summary_urls(self):
+        """Get the summary URLs of all configured remotes"""
+        try:
+            result = subprocess.run(['flatpak', 'remotes', '--columns=name,url'], 
+                                  capture_output=True, text=True)
+            
+            urls = []
+            for line in result.stdout.split('\n'):
+                parts = line.split('\t')
+                if len(parts) >= 2 and parts[1].startswith(('http://', 'https://')):
+                    base = parts[1].rstrip('/')
+                    # Newer repositories publish an indexed summary next to the classic one
+                    urls.extend([f"{base}/summary", f"{base}/summary.idx"])
+            return urls
+        except Exception as e:
+            self.logger.warning(f"Could not list Flatpak remotes: {e}")
+            return []
+    
     def _is_flatpak_available(self):
         """Check if Flatpak is available on the system"""
         try:
@@ -105,46 +213,85 @@ class FlatpakManager:
         except (subprocess.CalledProcessError, FileNotFoundError):
             return False
     
-    def _get_current_version(self, app_id):
-        """Get currently installed version of a Flatpak app"""
+    def _get_installed(self):
+        """Get {(ID, branch): (version, installation)} of all Flatpak apps and runtimes in one call"""
         try:
-            result = subprocess.run(['flatpak', 'list', '--app', '--columns=application,version'], 
+            # Runtimes are updated too, and several branches of one runtime are often installed
+            result = subprocess.run(['flatpak', 'list', '--app', '--runtime',
+                                     '--columns=application,version,branch,installation'], 
                                   capture_output=True, text=True)
             
+            installed = {}
             for line in result.stdout.split('\n'):
                 parts = line.split('\t')
-                if len(parts) >= 2 and parts[0] == app_id:
-                    return parts[1]
+                if len(parts) >= 3:
+                    installation = parts[3] if len(parts) >= 4 and parts[3] else 'system'
+                    installed[(parts[0], parts[2])] = (parts[1] or "Unknown", installation)
             
-            return "Unknown"
+            return installed
         except:
-            return "Unknown"
+            return {}
+    
+    @staticmethod
+    def _cache_version(version, commit):
+        """Get the metadata cache key of a remote commit, e.g. '1.2@0123456789ab'"""
+        return f"{version}@{commit}" if commit else version
     
-    def _get_app_description(self, app_id):
-        """Get Flatpak application description"""
+    def _get_app_metadata(self, app_id, version, origin):
+        """Get description and size of a Flatpak app version"""
+        metadata = self.metadata_cache.get('flatpak', app_id, version)
+        if metadata is not None:
+            return metadata
+        
+        # One flatpak info lookup serves both description and size
+        info = self._get_app_info(app_id)
+        description = info.get('Description') or info.get('Summary')
+        size = self._parse_size(info.get('Installed') or info.get('Installed size') or info.get('Size'))
+        first_seen = self.metadata_cache.put('flatpak', app_id, version,
+                                             description=description, size=size, origin=origin)
+        
+        return {
+            'description': description,
+            'size': size,
+            'origin': origin,
+            'first_seen': first_seen
+        }
+    
+    def _get_app_info(self, app_id):
+        """Get the output of flatpak info as a dict"""
+        info = {}
         try:
             result = subprocess.run(['flatpak', 'info', app_id], 
                                   capture_output=True, text=True)
             
             for line in result.stdout.split('\n'):
-                if line.startswith('Description:'):
-                    return line.split(':', 1)[1].strip()
-            
-            return "No description available"
-        except:
-            return "No description available"
+                line = line.strip()
+                if not line:
+                    continue
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    info.setdefault(key.strip(), value.strip())
+                elif ' - ' in line and 'Summary' not in info:
+                    # Header line: "Name - Summary"
+                    info['Summary'] = line.split(' - ', 1)[1]
+        except Exception as e:
+            self.logger.warning(f"Could not read Flatpak info for {app_id}: {e}")
+        
+        return info
     
-    def _get_app_size(self, app_id, version):
-        """Get Flatpak application size"""
+    def _parse_size(self, size_info):
+        """Parse a size like "60.8 MB" as printed by flatpak into bytes"""
+        units = {'bytes': 1, 'B': 1, 'kB': 1000, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4}
         try:
-            result = subprocess.run(['flatpak', 'info', app_id], 
-                                  capture_output=True, text=True)
-            
-            for line in result.stdout.split('\n'):
-                if 'Size:' in line:
-                    size_info = line.split(':', 1)[1].strip()
-                    return size_info
-            
-            return "Unknown"
-        except:
-            return "Unknown"
\ No newline at end of file
+            value, unit = size_info.replace('\xa0', ' ').replace(',', '.').split()
+            return int(float(value) * units[unit])
+        except (AttributeError, KeyError, ValueError):
+            return None
+    
+    def _format_size(self, bytes_size):
+        """Format size in human readable format"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if bytes_size < 1024.0:
+                return f"{bytes_size:.1f} {unit}"
+            bytes_size /= 1024.0
+        return f"{bytes_size:.1f} TB"
@@ -0,0 +1,185 @@
+"""
+Firmware Update Interface
+Handles device firmware updates through fwupd
+"""
+
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from utils.logger import Logger
+from .metadata_cache import MetadataCache
+from .repo_probe import RepositoryProbe
+from .backends import Backend
+
+# fwupdmgr exit status when there is nothing to do
+NOTHING_TO_DO = 2
+
+class FwupdManager(Backend):
+    """Manager for firmware updates of devices known to fwupd"""
+
+    name = 'fwupd'
+    label = 'Firmware'
+    capabilities = frozenset({'security', 'preflight'})
+
+    # Devices that need one of these to apply the firmware
+    REBOOT_FLAGS = {'needs-reboot', 'needs-shutdown'}
+
+    def __init__(self, metadata_cache=None, parent_window=None, command=None):
+        self.logger = Logger()
+
+        try:
+            from config import FWUPDMGR_COMMAND
+        except ImportError:
+            FWUPDMGR_COMMAND = 'fwupdmgr'
+
+        # The command can point to a stub that prints fixture JSON
+        self.command = command or FWUPDMGR_COMMAND
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.repo_probe = RepositoryProbe('fwupd')
+
+    def is_available(self):
+        """Check if fwupdmgr is available on the system"""
+        return shutil.which(self.command) is not None
+
+    def get_updates(self, update_cache=True):
+        """Get list of available firmware updates"""
+        try:
+            self.logger.info("Checking for firmware updates...")
+
+            # Download new metadata, unless no remote changed
+            if update_cache:
+                if self.repo_probe.check(self._metadata_urls()):
+                    self.update_cache()
+                else:
+                    self.logger.info("Firmware remotes unchanged, skipping metadata refresh")
+
+            result = subprocess.run([self.command, 'get-updates', '--json'],
+                                  capture_output=True, text=True)
+            if result.returncode == NOTHING_TO_DO:
+                self.logger.info("Found 0 firmware updates")
+                return []
+            if result.returncode != 0:
+                self.logger.error(f"Error getting firmware updates: {result.stderr.strip()}")
+                return []
+
+            updates = [self._parse_device(device) for device in json.loads(result.stdout).get('Devices', [])
+                       if device.get('Releases')]
+
+            self.metadata_cache.commit()
+            self.logger.info(f"Found {len(updates)} firmware updates")
+            return updates
+
+        except ValueError as e:
+            self.logger.error(f"Invalid fwupdmgr output: {e}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Unexpected error in firmware manager: {e}")
+            return []
+
+    def update_cache(self):
+        """Download the metadata of all enabled remotes"""
+        result = subprocess.run([self.command, 'refresh'], capture_output=True, text=True)
+        if result.returncode in (0, NOTHING_TO_DO):
+            self.repo_probe.commit()
+            return True
+        self.logger.warning(f"Could not refresh firmware metadata: {result.stderr.strip()}")
+        return False
+
+    def install_update(self, update):
+        """Flash the new firmware on one device"""
+        try:
+            self.logger.info(f"Installing firmware update: {update['name']} {update['new_version']}")
+
+            # fwupd asks PolicyKit itself, and the reboot is left to the user
+            result = subprocess.run([self.command, 'update', update['device_id'],
+                                     '--assume-yes', '--no-reboot-check'],
+                                  capture_output=True, text=True)
+
+            if result.returncode == 0:
+                self.logger.info(f"Successfully updated firmware of {update['name']}")
+                if update.get('needs_reboot'):
+                    self.logger.info(f"Firmware of {update['name']} is applied on the next reboot")
+                return True
+            else:
+                self.logger.error(f"Failed to update firmware of {update['name']}: {result.stderr}")
+                return False
+
+        except Exception as e:
+            self.logger.error(f"Error installing firmware update {update['name']}: {e}")
+            return False
+
+    def simulate_install(self, updates):
+        """Report the download size of the given firmware updates"""
+        # Firmware files are downloaded to the user cache and flashed, nothing is installed on disk
+        return {
+            'download_size': sum(update.get('size_bytes') or 0 for update in updates),
+            'download_path': str(Path.home() / '.cache'),
+            'installed_size': 0,
+            'installed_path': '/var/lib/fwupd',
+            'errors': []
+        }
+
+    def _parse_device(self, device):
+        """Turn a device and its newest release into an update record"""
+        release = device['Releases'][0]
+        device_id = device['DeviceId']
+        version = release.get('Version', 'Unknown')
+        origin = release.get('RemoteId', '')
+        size_bytes = release.get('Size')
+        description = self._plain_text(release.get('Summary') or release.get('Description'))
+
+        metadata = self.metadata_cache.get('fwupd', device_id, version)
+        if metadata is None:
+            first_seen = self.metadata_cache.put('fwupd', device_id, version,
+                                                 description=description, size=size_bytes, origin=origin)
+        else:
+            first_seen = metadata['first_seen']
+
+        # Releases that fix CVEs or are marked urgent by the vendor count as security updates
+        is_security = bool(release.get('Issues')) or release.get('Urgency') in ('high', 'critical')
+
+        return {
+            'name': device.get('Name', device_id),
+            'device_id': device_id,  # Device for fwupdmgr commands
+            'app_id': release.get('AppstreamId'),
+            'current_version': device.get('Version', 'Unknown'),
+            'new_version': version,
+            'source': 'fwupd',
+            'type': 'firmware',
+            'is_security': is_security,
+            'origin': origin,
+            'needs_reboot': bool(self.REBOOT_FLAGS & set(device.get('Flags', []))),
+            'first_seen': first_seen,
+            'description': description or "No description available",
+            'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+            'size_bytes': size_bytes
+        }
+
+    def _metadata_urls(self):
+        """Get the metadata URLs of all enabled download remotes"""
+        try:
+            result = subprocess.run([self.command, 'get-remotes', '--json'],
+                                  capture_output=True, text=True)
+            remotes = json.loads(result.stdout).get('Remotes', [])
+            return [remote['MetadataUri'] for remote in remotes
+                    if remote.get('Enabled') in (True, 'true') and remote.get('Kind') == 'download'
+                    and str(remote.get('MetadataUri', '')).startswith(('http://', 'https://'))]
+        except Exception as e:
+            self.logger.warning(f"Could not list firmware remotes: {e}")
+            return []
+
+    def _plain_text(self, markup):
+        """Strip the AppStream markup from a release description"""
+        if not markup:
+            return None
+        return re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', markup)).strip()
+
+    def _format_size(self, bytes_size):
+        """Format size in human readable format"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if bytes_size < 1024.0:
+                return f"{bytes_size:.1f} {unit}"
+            bytes_size /= 1024.0
+        return f"{bytes_size:.1f} TB"
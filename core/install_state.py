@@ -0,0 +1,78 @@
+"""
+Install Checkpoint
+Progress of a running installation, kept on disk so an interrupted one can be resumed
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from utils.logger import Logger
+from .journal import update_key
+
+class InstallCheckpoint:
+    """Records which updates of the current transaction are done in CACHE_DIR/install_state.json"""
+
+    def __init__(self, path=None):
+        self.logger = Logger()
+
+        try:
+            from config import CACHE_DIR
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+
+        self.path = Path(path) if path else CACHE_DIR / 'install_state.json'
+        self._state = None
+
+    def start(self, transaction_id, updates):
+        """Begin checkpointing a transaction"""
+        self._state = {
+            'transaction': transaction_id,
+            'started': time.time(),
+            'updates': list(updates),
+            'done': []
+        }
+        self._save()
+
+    def mark_done(self, updates):
+        """Record installed updates; written through so a power loss keeps them"""
+        if self._state is None:
+            return
+        self._state['done'].extend(list(update_key(update)) for update in updates)
+        self._save()
+
+    def finish(self):
+        """Forget the transaction after it ran to the end"""
+        self._state = None
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Could not remove install checkpoint: {e}")
+
+    def load(self):
+        """Get the interrupted transaction with its remaining updates, or None"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            # JSON turns the key tuples into lists; keys of older checkpoints match nothing
+            done = {tuple(key) for key in state['done'] if isinstance(key, list)}
+            state['remaining'] = [update for update in state['updates'] if update_key(update) not in done]
+            return state
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Ignoring unreadable install checkpoint: {e}")
+            return None
+
+    def _save(self):
+        """Atomically replace the checkpoint file"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix('.tmp')
+            with open(temporary, 'w') as f:
+                json.dump(self._state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            temporary.replace(self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not write install checkpoint: {e}")
@@ -0,0 +1,139 @@
+"""
+Transaction Journal
+Append-only JSON lines record of every installation
+"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from utils.logger import Logger
+
+def update_key(update):
+    """Identify an update version; display names are not unique across sources or Flatpak refs"""
+    return (update['source'], update.get('app_id') or update['name'], update.get('architecture'),
+            update.get('branch'), update.get('new_version'))
+
+class Transaction:
+    """One installation run; each record is one line in the journal"""
+
+    def __init__(self, journal, updates):
+        self.journal = journal
+        self.id = uuid.uuid4().hex
+        self.start = time.time()
+        self.total = len(updates)
+        # Keys of the updates, see update_key()
+        self.installed = []
+        self.failed = []
+        self._names = {}
+        self.bytes = 0
+
+        self.journal.write({
+            'event': 'begin',
+            'transaction': self.id,
+            'time': self.start,
+            'updates': self.total
+        })
+        self.journal.sync()
+
+    def record(self, updates, start, end, success):
+        """Record the outcome of updates installed together"""
+        for update in updates:
+            size = update.get('size_bytes') or 0
+            entry = {
+                'event': 'package',
+                'transaction': self.id,
+                'name': update['name'],
+                'source': update['source'],
+                'current_version': update.get('current_version'),
+                'new_version': update.get('new_version'),
+                'start': start,
+                'end': end,
+                'duration': round(end - start, 3),
+                'success': success,
+                'bytes': size
+            }
+            # What tells updates with the same name apart
+            entry.update((field, update[field]) for field in ('app_id', 'architecture', 'branch')
+                         if update.get(field))
+            self.journal.write(entry)
+
+            key = update_key(update)
+            self._names[key] = update['name']
+            if success:
+                self.installed.append(key)
+                self.bytes += size
+            else:
+                self.failed.append(key)
+
+        # The journal matters most when the installation crashes, so each batch goes to disk now
+        self.journal.sync()
+
+    def finish(self, error=None):
+        """Close the transaction and return its summary"""
+        end = time.time()
+        summary = {
+            'transaction': self.id,
+            'total': self.total,
+            'installed': len(self.installed),
+            'failed': [self._names[key] for key in self.failed],
+            'bytes': self.bytes,
+            'duration': round(end - self.start, 3),
+            'success': error is None and not self.failed and len(self.installed) == self.total
+        }
+        if error is not None:
+            summary['error'] = str(error)
+
+        self.journal.write(dict(summary, event='end', time=end))
+        self.journal.flush()
+        return summary
+
+class TransactionJournal:
+    """Buffered writer for LOG_DIR/transactions.jsonl"""
+
+    def __init__(self, path=None):
+        self.logger = Logger()
+
+        try:
+            from config import LOG_DIR
+        except ImportError:
+            LOG_DIR = Path.home() / '.local' / 'share' / 'gup'
+
+        self.path = Path(path) if path else LOG_DIR / 'transactions.jsonl'
+        self._file = None
+
+    def begin(self, updates):
+        """Start recording an installation of the given updates"""
+        return Transaction(self, updates)
+
+    def write(self, entry):
+        """Append one entry; lines reach the disk on the next sync"""
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', buffering=64 * 1024)
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        except OSError as e:
+            self.logger.warning(f"Could not write transaction journal: {e}")
+
+    def sync(self):
+        """Force buffered entries onto the disk, so they survive a crash or power loss"""
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            self.logger.warning(f"Could not write transaction journal: {e}")
+
+    def flush(self):
+        """Write buffered entries to the disk and close the file"""
+        if self._file is None:
+            return
+        self.sync()
+        try:
+            self._file.close()
+        except OSError as e:
+            self.logger.warning(f"Could not write transaction journal: {e}")
+        self._file = None
@@ -0,0 +1,183 @@
+"""
+Package Metadata Cache
+Persistent store for package details so unchanged updates need no lookups
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from utils.logger import Logger
+
+class MetadataCache:
+    """SQLite-backed metadata store keyed by (source, name, version) with LRU eviction"""
+
+    # Bump when the metadata table layout changes; old caches are simply rebuilt
+    SCHEMA_VERSION = 4
+
+    # First-seen times are kept apart from the evictable metadata, so update delays never
+    # start over; versions not offered for this long (seconds) are forgotten
+    FIRST_SEEN_RETENTION = 365 * 86400
+
+    FIELDS = ('description', 'size', 'origin', 'source_package')
+
+    def __init__(self, path=None, max_entries=None):
+        self.logger = Logger()
+
+        # Import config settings, explicit arguments take precedence
+        try:
+            from config import CACHE_DIR, METADATA_CACHE_MAX_ENTRIES
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+            METADATA_CACHE_MAX_ENTRIES = 5000
+
+        self.path = Path(path) if path else CACHE_DIR / 'metadata.sqlite'
+        self.max_entries = METADATA_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+        try:
+            self._conn = self._open()
+        except sqlite3.Error as e:
+            # Run without a cache rather than failing the refresh
+            self.logger.warning(f"Metadata cache unavailable ({self.path}): {e}")
+
+    def _open(self):
+        """Open the database, rebuilding it if the schema is outdated"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+
+        if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            # First-seen times survive, their table has not changed since it was added
+            conn.execute('DROP TABLE IF EXISTS metadata')
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS metadata (
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                description TEXT,
+                size INTEGER,
+                origin TEXT,
+                source_package TEXT,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source, name, version)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS metadata_last_used ON metadata (last_used)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS first_seen (
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                first_seen INTEGER NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (source, name, version)
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+        return conn
+
+    def get(self, source, name, version):
+        """Get cached metadata for a package version, or None if unknown"""
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT description, size, origin, source_package FROM metadata '
+                    'WHERE source = ? AND name = ? AND version = ?',
+                    (source, name, version)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                now = time.time()
+                self._conn.execute(
+                    'UPDATE metadata SET last_used = ? WHERE source = ? AND name = ? AND version = ?',
+                    (now, source, name, version)
+                )
+                first_seen = self._seen(source, name, version, now)
+
+            metadata = dict(zip(self.FIELDS, row))
+            metadata['first_seen'] = first_seen
+            return metadata
+        except sqlite3.Error as e:
+            self.logger.warning(f"Metadata cache lookup failed for {name}: {e}")
+            return None
+
+    def put(self, source, name, version, description=None, size=None, origin=None, source_package=None):
+        """Store metadata for a package version and return when the version was first seen"""
+        now = time.time()
+        if self._conn is None:
+            return int(now)
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (source, name, version) DO UPDATE SET '
+                    'description = excluded.description, size = excluded.size, '
+                    'origin = excluded.origin, '
+                    'source_package = excluded.source_package, last_used = excluded.last_used',
+                    (source, name, version, description, size, origin, source_package, now)
+                )
+                return self._seen(source, name, version, now)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not cache metadata for {name}: {e}")
+            return int(now)
+
+    def first_seen(self, source, name, version):
+        """Get when a package version was first seen, recording it as seen now if it is new"""
+        now = time.time()
+        if self._conn is None:
+            return int(now)
+
+        try:
+            with self._lock:
+                return self._seen(source, name, version, now)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not look up first-seen time of {name}: {e}")
+            return int(now)
+
+    def _seen(self, source, name, version, now):
+        """Record a sighting of a package version and return its first-seen time; called with the lock held"""
+        self._conn.execute(
+            'INSERT INTO first_seen VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (source, name, version) DO UPDATE SET last_seen = excluded.last_seen',
+            (source, name, version, int(now), now)
+        )
+        return self._conn.execute(
+            'SELECT first_seen FROM first_seen WHERE source = ? AND name = ? AND version = ?',
+            (source, name, version)
+        ).fetchone()[0]
+
+    def commit(self):
+        """Write pending changes and evict the least recently used entries"""
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'DELETE FROM metadata WHERE (source, name, version) IN ('
+                    'SELECT source, name, version FROM metadata '
+                    'ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+                self._conn.execute('DELETE FROM first_seen WHERE last_seen < ?',
+                                   (time.time() - self.FIRST_SEEN_RETENTION,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not write metadata cache: {e}")
+
+    def clear(self):
+        """Remove all cached metadata; first-seen times are kept for the update policy"""
+        if self._conn is None:
+            return
+
+        with self._lock:
+            self._conn.execute('DELETE FROM metadata')
+            self._conn.commit()
@@ -0,0 +1,90 @@
+"""
+Refresh Pipeline
+Resolves update details in a bounded worker pool while the listing is still running
+"""
+
+import queue
+import threading
+import time
+from utils.logger import Logger
+
+# Listed entries waiting for a worker; the listing blocks when this many are queued
+QUEUE_SIZE = 64
+
+class Batcher:
+    """Hands records to a callback in batches, after a number of records or an interval"""
+
+    def __init__(self, callback, size=100, interval=0.25):
+        self.callback = callback
+        self.size = size
+        self.interval = interval
+        self._records = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """Queue a record, delivering the batch when it is full or old enough"""
+        with self._lock:
+            self._records.append(record)
+            if len(self._records) < self.size and time.monotonic() - self._last_flush < self.interval:
+                return
+            batch = self._take()
+        self.callback(batch)
+
+    def flush(self):
+        """Deliver the records still queued"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self.callback(batch)
+
+    def _take(self):
+        """Remove and return the queued records; called with the lock held"""
+        batch, self._records = self._records, []
+        self._last_flush = time.monotonic()
+        return batch
+
+def resolve_pipelined(entries, lookup, resolve, found=None, workers=4):
+    """Turn listed entries into records, resolving the slow ones in parallel
+
+    lookup(entry) returns (record, complete) without blocking; incomplete records are
+    passed to found right away and replaced by resolve(entry) once a worker gets to
+    them. Records are returned in listing order.
+    """
+    logger = Logger()
+    records = []
+    pending = queue.Queue(maxsize=QUEUE_SIZE)
+
+    def work():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            index, entry = item
+            try:
+                records[index] = resolve(entry)
+            except Exception as e:
+                logger.warning(f"Could not resolve details of {entry}: {e}")
+                continue
+            if found:
+                found(records[index])
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(max(workers, 1))]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for entry in entries:
+            record, complete = lookup(entry)
+            records.append(record)
+            if found:
+                found(record)
+            if not complete:
+                pending.put((len(records) - 1, entry))
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    return records
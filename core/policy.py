@@ -0,0 +1,171 @@
+"""
+Update Policy
+Rules that decide which updates are selected for installation
+
+Rules are read from CONFIG_DIR/policy.json, all keys are optional:
+
+    {
+        "security_only": false,
+        "security_immediately": true,
+        "delay_days": 0,
+        "rollout_percentage": 100,
+        "blocked": ["linux-image-*"]
+    }
+
+- security_only: select nothing but security updates
+- security_immediately: security updates skip the delay and the rollout
+- delay_days: wait this long after an update was first seen
+- rollout_percentage: share of machines that get an update right away
+- blocked: names or app IDs (shell patterns) never selected
+
+Rules of the wrong type or out of range are logged and left at their defaults.
+"""
+
+import fnmatch
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from utils.logger import Logger
+
+# Reasons for leaving an update unselected
+BLOCKED = 'blocked'
+NOT_SECURITY = 'not-security'
+DELAYED = 'delayed'
+NOT_IN_ROLLOUT = 'not-in-rollout'
+
+def _is_number(value, low, high):
+    """Check for an int or float within [low, high]; JSON true and false are not numbers"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and low <= value <= high
+
+# Checks of the values policy.json may set
+RULE_CHECKS = {
+    'security_only': lambda value: isinstance(value, bool),
+    'security_immediately': lambda value: isinstance(value, bool),
+    'delay_days': lambda value: _is_number(value, 0, 3650),
+    'rollout_percentage': lambda value: _is_number(value, 0, 100),
+    'blocked': lambda value: isinstance(value, list) and all(isinstance(name, str) for name in value)
+}
+
+class UpdatePolicy:
+    """Evaluates selection rules for a list of updates in a single pass"""
+
+    DEFAULT_RULES = {
+        'security_only': False,
+        'security_immediately': True,
+        'delay_days': 0,
+        'rollout_percentage': 100,
+        'blocked': []
+    }
+
+    MACHINE_ID_FILES = ['/etc/machine-id', '/var/lib/dbus/machine-id']
+
+    def __init__(self, rules=None, machine_id=None):
+        self.logger = Logger()
+        self.rules = dict(self.DEFAULT_RULES, **(rules or {}))
+        self.machine_id = self._read_machine_id() if machine_id is None else machine_id
+
+        # Index the block list once: exact names in a set, patterns in one regex
+        blocked = self.rules['blocked']
+        self._blocked_names = {name for name in blocked if not re.search(r'[*?\[]', name)}
+        patterns = [fnmatch.translate(name) for name in blocked if name not in self._blocked_names]
+        self._blocked_pattern = re.compile('|'.join(patterns)) if patterns else None
+
+    @classmethod
+    def load(cls, path=None):
+        """Load the policy file, falling back to the default rules"""
+        if path is None:
+            try:
+                from config import CONFIG_DIR
+            except ImportError:
+                CONFIG_DIR = Path.home() / '.config' / 'gup'
+            path = CONFIG_DIR / 'policy.json'
+
+        rules = {}
+        try:
+            with open(path) as f:
+                rules = json.load(f)
+            if not isinstance(rules, dict):
+                raise ValueError("the top level must be an object")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            Logger().error(f"Invalid update policy {path}, using defaults: {e}")
+            rules = {}
+
+        return cls(cls.validate(rules, path))
+
+    @staticmethod
+    def validate(rules, path='policy'):
+        """Get the valid rules, logging and dropping the others"""
+        valid = {}
+        for key, value in rules.items():
+            check = RULE_CHECKS.get(key)
+            if check is None:
+                Logger().warning(f"Ignoring unknown rule '{key}' in {path}")
+            elif not check(value):
+                Logger().error(f"Ignoring invalid rule '{key}': {value!r} in {path}")
+            else:
+                valid[key] = value
+        return valid
+
+    def evaluate(self, updates, now=None):
+        """Return the reason each update is held back, or None if it is selected"""
+        now = time.time() if now is None else now
+        cutoff = now - self.rules['delay_days'] * 86400
+        percentage = self.rules['rollout_percentage']
+        security_immediately = self.rules['security_immediately']
+        security_only = self.rules['security_only']
+
+        decisions = []
+        for update in updates:
+            is_security = update.get('is_security', False)
+            if self._is_blocked(update):
+                reason = BLOCKED
+            elif security_only and not is_security:
+                reason = NOT_SECURITY
+            elif is_security and security_immediately:
+                reason = None
+            elif update.get('first_seen', now) > cutoff:
+                reason = DELAYED
+            elif percentage < 100 and self.rollout_bucket(update) >= percentage:
+                reason = NOT_IN_ROLLOUT
+            else:
+                reason = None
+            decisions.append(reason)
+        return decisions
+
+    def select(self, updates, now=None):
+        """Get the updates the policy selects for installation"""
+        return [update for update, reason in zip(updates, self.evaluate(updates, now)) if reason is None]
+
+    def rollout_bucket(self, update):
+        """Stable bucket 0-99 of this machine for an update version"""
+        # Each version rolls out to a different set of machines, so no machine is always first
+        key = f"{self.machine_id}:{update['source']}:{update['name']}:{update['new_version']}"
+        return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big') % 100
+
+    def _is_blocked(self, update):
+        """Check the block list against the package name and Flatpak app ID"""
+        for name in (update['name'], update.get('app_id')):
+            if name is None:
+                continue
+            if name in self._blocked_names:
+                return True
+            if self._blocked_pattern and self._blocked_pattern.match(name):
+                return True
+        return False
+
+    def _read_machine_id(self):
+        """Read the machine ID used to place this machine in rollouts"""
+        for path in self.MACHINE_ID_FILES:
+            try:
+                with open(path) as f:
+                    machine_id = f.read().strip()
+                if machine_id:
+                    return machine_id
+            except OSError:
+                continue
+        self.logger.warning("No machine ID found, all rollouts use the same bucket")
+        return ''
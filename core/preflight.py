@@ -0,0 +1,93 @@
+"""
+Pre-flight Checks
+Simulates an installation before any download starts
+"""
+
+import os
+from utils.logger import Logger
+
+class PreflightChecker:
+    """Checks disk space and package conflicts for a whole selection of updates"""
+
+    def __init__(self, backends):
+        self.logger = Logger()
+        self.backends = backends
+
+    def check(self, updates):
+        """Simulate installing all updates and report anything that would make it fail"""
+        self.logger.info(f"Running pre-flight checks for {len(updates)} updates...")
+
+        # Space needed per mount point
+        required = {}
+        report = {
+            'download_size': 0,
+            'installed_size': 0,
+            'low_space': [],
+            'held': [],
+            'removals': [],
+            'errors': []
+        }
+        for name, backend in self.backends.items():
+            selected = [u for u in updates if u['source'] == name]
+            if not selected:
+                continue
+
+            result = backend.simulate_install(selected)
+            if result.get('installed_paths'):
+                # Spread over several installations, each downloaded into directly
+                for path, size in result['installed_paths'].items():
+                    self._require(required, path, max(size, 0))
+            elif result.get('download_path'):
+                self._require(required, result['download_path'], result['download_size'])
+                self._require(required, result['installed_path'], max(result['installed_size'], 0))
+            else:
+                # Downloaded straight into the installation
+                self._require(required, result['installed_path'],
+                              result['download_size'] + max(result['installed_size'], 0))
+
+            report['download_size'] += result['download_size']
+            report['installed_size'] += result['installed_size']
+            report['held'] += result.get('held', [])
+            report['removals'] += result.get('removals', [])
+            report['errors'] += result['errors']
+
+        for mount, needed in required.items():
+            available = self._free_space(mount)
+            if available is not None and needed > available:
+                report['low_space'].append({'path': mount, 'required': needed, 'available': available})
+
+        low_space = report['low_space']
+        report['ok'] = not (low_space or report['held'] or report['removals'] or report['errors'])
+
+        if report['ok']:
+            self.logger.info(f"Pre-flight checks passed: {report['download_size']} bytes to download, "
+                             f"{report['installed_size']} bytes of additional disk space")
+        else:
+            self.logger.warning(f"Pre-flight checks failed: low space on {[s['path'] for s in low_space]}, "
+                                f"held {report['held']}, removals {report['removals']}, "
+                                f"errors {report['errors']}")
+        return report
+
+    def _require(self, required, path, size):
+        """Add a space requirement for the mount point containing path"""
+        if not size:
+            return
+        mount = self._mount_point(path)
+        required[mount] = required.get(mount, 0) + size
+
+    def _mount_point(self, path):
+        """Get the mount point of the nearest existing parent of path"""
+        path = os.path.realpath(path)
+        while not os.path.exists(path):
+            path = os.path.dirname(path)
+        while not os.path.ismount(path):
+            path = os.path.dirname(path)
+        return path
+
+    def _free_space(self, path):
+        """Get bytes available on the file system containing path"""
+        try:
+            stat = os.statvfs(path)
+            return stat.f_bavail * stat.f_frsize
+        except OSError:
+            return None
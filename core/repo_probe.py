@@ -0,0 +1,117 @@
+"""
+Repository Probe
+Cheap conditional requests to find out whether repository metadata changed
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.logger import Logger
+
+class RepositoryProbe:
+    """Tracks ETag/Last-Modified fingerprints of repository index files"""
+
+    def __init__(self, name, state_dir=None, timeout=5):
+        self.logger = Logger()
+
+        try:
+            from config import CACHE_DIR
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+
+        self.name = name
+        self.state_file = Path(state_dir or CACHE_DIR / 'fingerprints') / f'{name}.json'
+        self.timeout = timeout
+        self.bytes_transferred = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def check(self, urls):
+        """Return True if any of the index files changed since the last commit"""
+        urls = sorted(set(urls))
+        if not urls:
+            return True
+
+        known = self._load()
+        self.bytes_transferred = 0
+
+        with ThreadPoolExecutor(max_workers=min(len(urls), 8)) as pool:
+            fingerprints = dict(zip(urls, pool.map(lambda url: self._probe(url, known.get(url)), urls)))
+
+        # Unreachable or unknown sources always count as changed
+        changed = [url for url in urls if fingerprints[url] is None or fingerprints[url] != known.get(url)]
+        self._pending = {url: fp for url, fp in fingerprints.items() if fp is not None}
+
+        if changed:
+            self.logger.info(f"{len(changed)} of {len(urls)} {self.name} sources changed upstream")
+        else:
+            self.logger.info(f"All {len(urls)} {self.name} sources unchanged "
+                             f"({self.bytes_transferred} bytes probed)")
+        return bool(changed)
+
+    def commit(self):
+        """Remember the fingerprints of the last check after a successful refresh"""
+        if self._pending is None:
+            return
+
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.state_file.with_suffix('.tmp')
+            with open(temporary, 'w') as f:
+                json.dump(self._pending, f)
+            temporary.replace(self.state_file)
+        except OSError as e:
+            self.logger.warning(f"Could not save repository fingerprints: {e}")
+        self._pending = None
+
+    def _load(self):
+        """Load the fingerprints of the last successful refresh"""
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _probe(self, url, known):
+        """Send a conditional HEAD request and return the current fingerprint"""
+        if not url.startswith(('http://', 'https://')):
+            return None  # file:, cdrom: etc. are cheap to refresh anyway
+
+        request = urllib.request.Request(url, method='HEAD')
+        if known:
+            if known.get('etag'):
+                request.add_header('If-None-Match', known['etag'])
+            if known.get('last_modified'):
+                request.add_header('If-Modified-Since', known['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                self._count(response)
+                fingerprint = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'length': response.headers.get('Content-Length')
+                }
+            # Without any validator the file can't be compared
+            if not (fingerprint['etag'] or fingerprint['last_modified']):
+                return None
+            return fingerprint
+        except urllib.error.HTTPError as e:
+            self._count(e)
+            if e.code == 304 and known:
+                return known
+            if e.code == 404:
+                return {'missing': True}  # Optional files (e.g. summary.idx) stay comparable
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            self.logger.debug(f"Could not probe {url}: {e}")
+            return None
+
+    def _count(self, response):
+        """Add the size of a response's status line and headers to the transfer count"""
+        size = len(str(response.headers)) + 20
+        with self._lock:
+            self.bytes_transferred += size
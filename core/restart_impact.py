@@ -0,0 +1,219 @@
+"""
+Restart Impact
+Finds out which updates need a reboot or a restart of running programs
+"""
+
+import fnmatch
+import json
+import os
+import re
+from pathlib import Path
+from utils.logger import Logger
+
+# Impact of an update, from weakest to strongest
+RESTART = 'restart'
+REBOOT = 'reboot'
+IMPACT_ORDER = {None: 0, RESTART: 1, REBOOT: 2}
+
+# Packages that only take full effect after a reboot (shell patterns)
+REBOOT_PACKAGES = [
+    'linux-image-*', 'linux-modules-*', 'linux-firmware*', '*-microcode',
+    'libc6', 'systemd', 'udev', 'dbus', 'dbus-broker'
+]
+
+# Written by package maintainer scripts that need a reboot
+REBOOT_REQUIRED_FILE = Path('/run/reboot-required')
+
+SHARED_LIBRARY = re.compile(r'\.so(\.[\d.]+)?$')
+
+# Marks mappings of files that were replaced or removed after being mapped
+DELETED = b' (deleted)'
+
+# Maps of processes with huge address spaces are only read this far
+MAX_MAPS_BYTES = 4 * 1024 * 1024
+
+def strongest(impacts):
+    """Get the strongest of several impacts"""
+    return max(impacts, key=IMPACT_ORDER.__getitem__, default=None)
+
+def canonical_path(path):
+    """Fold /usr/lib and /lib into one, they are the same with merged /usr"""
+    if path.startswith(('/usr/lib', '/usr/bin', '/usr/sbin')):
+        return path[4:]
+    return path
+
+def mapped_files(proc, pid, deleted=False):
+    """Get the files a process has mapped, None if its maps cannot be read
+
+    With deleted, only files replaced or removed since they were mapped are
+    returned, without the " (deleted)" marker.
+    """
+    try:
+        with open(f'{proc}/{pid}/maps', 'rb') as f:
+            data = f.read(MAX_MAPS_BYTES)
+    except OSError:
+        # The process exited or belongs to another user
+        return None
+
+    # Most processes have nothing deleted mapped; the byte search avoids parsing their maps
+    if deleted and DELETED not in data:
+        return set()
+
+    files = set()
+    for line in data.split(b'\n'):
+        parts = line.split(None, 5)
+        if len(parts) != 6 or not parts[5].startswith(b'/'):
+            continue
+        path = parts[5]
+        if deleted:
+            if not path.endswith(DELETED):
+                continue
+            path = path[:-len(DELETED)]
+        files.add(os.fsdecode(path))
+    return files
+
+def read_maps(proc, pid):
+    """Get the command name and the mapped shared libraries of a process, None if unreadable"""
+    try:
+        with open(f'{proc}/{pid}/comm') as f:
+            command = f.read().strip()
+    except OSError:
+        return None
+
+    files = mapped_files(proc, pid)
+    if files is None:
+        return None
+    return command, {path for path in files if SHARED_LIBRARY.search(path)}
+
+def reboot_required_packages():
+    """Packages that asked for a reboot through /run/reboot-required, None if no reboot is pending"""
+    if not REBOOT_REQUIRED_FILE.exists():
+        return None
+    try:
+        return REBOOT_REQUIRED_FILE.with_suffix('.pkgs').read_text().split()
+    except OSError:
+        return []
+
+class LibraryIndex:
+    """Shared library paths and the Debian packages owning them, cached until dpkg changes"""
+
+    def __init__(self, path=None, info_dir='/var/lib/dpkg/info'):
+        self.logger = Logger()
+
+        try:
+            from config import CACHE_DIR
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+
+        self.path = Path(path) if path else CACHE_DIR / 'library_index.json'
+        self.info_dir = Path(info_dir)
+        self._index = None
+
+    def owners(self):
+        """Get the index as {library path: package}"""
+        if self._index is None:
+            self._index = self._load()
+        return self._index
+
+    def _load(self):
+        """Read the cached index, rebuilding it if packages were installed or removed since"""
+        try:
+            # dpkg replaces .list files on every install, which changes the directory
+            stamp = self.info_dir.stat().st_mtime_ns
+        except OSError:
+            return {}
+
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            if cached['stamp'] == stamp:
+                return cached['owners']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        owners = self._build()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix('.tmp')
+            with open(temporary, 'w') as f:
+                json.dump({'stamp': stamp, 'owners': owners}, f, separators=(',', ':'))
+            temporary.replace(self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not cache library index: {e}")
+        return owners
+
+    def _build(self):
+        """Collect the shared libraries from the file lists of all installed packages"""
+        owners = {}
+        for list_file in self.info_dir.glob('*.list'):
+            # Multi-arch packages are listed as name:arch.list
+            package = list_file.stem.split(':', 1)[0]
+            try:
+                with open(list_file, errors='surrogateescape') as f:
+                    for line in f:
+                        path = line.rstrip('\n')
+                        if SHARED_LIBRARY.search(path):
+                            owners[canonical_path(path)] = package
+            except OSError:
+                continue
+        self.logger.info(f"Indexed {len(owners)} shared libraries")
+        return owners
+
+class RestartImpact:
+    """Decides per update whether it needs a reboot or running programs to restart"""
+
+    def __init__(self, proc='/proc', index=None):
+        self.logger = Logger()
+        self.proc = proc
+        self.index = index or LibraryIndex()
+        self._reboot_pattern = re.compile('|'.join(fnmatch.translate(name) for name in REBOOT_PACKAGES))
+
+    def annotate(self, updates):
+        """Set 'restart' (REBOOT, RESTART or None) and 'restart_programs' on each update"""
+        users = self._package_users() if any(u['source'] == 'apt' for u in updates) else {}
+
+        for update in updates:
+            programs = []
+            if update['source'] == 'apt' and self._reboot_pattern.match(update['name']):
+                impact = REBOOT
+            elif update.get('needs_reboot'):
+                impact = REBOOT
+            elif update['source'] == 'apt' and update['name'] in users:
+                impact = RESTART
+                programs = sorted(users[update['name']])
+            else:
+                impact = None
+            update['restart'] = impact
+            update['restart_programs'] = programs
+        return updates
+
+    def summarize(self, installed):
+        """Restart advice after installing the given updates"""
+        # Backends set needs_reboot when an installation turns out to wait for a reboot
+        reboot = {u['name'] for u in installed if u.get('restart') == REBOOT or u.get('needs_reboot')}
+        pending = reboot_required_packages()
+        if pending is not None:
+            reboot.update(pending or ['system'])
+
+        programs = set()
+        for update in installed:
+            programs.update(update.get('restart_programs', []))
+        return {'reboot_packages': sorted(reboot), 'restart_programs': sorted(programs)}
+
+    def _package_users(self):
+        """Map packages to the names of the programs that have their libraries loaded"""
+        owners = self.index.owners()
+        users = {}
+        # Only processes of the current user can be read unless running as root
+        for pid in os.listdir(self.proc):
+            if not pid.isdigit():
+                continue
+            mapped = read_maps(self.proc, pid)
+            if mapped is None:
+                continue
+            command, libraries = mapped
+            for library in libraries:
+                package = owners.get(canonical_path(library))
+                if package:
+                    users.setdefault(package, set()).add(command)
+        return users
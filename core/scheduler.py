@@ -0,0 +1,91 @@
+"""
+Background Refresh Scheduler
+Periodically refreshes updates while the application runs in the background
+"""
+
+import random
+from pathlib import Path
+from gi.repository import GLib, Gio
+from utils.logger import Logger
+
+class RefreshScheduler:
+    """Schedules jittered background refreshes, skipping them on battery or metered networks"""
+
+    def __init__(self, update_manager, interval=None, jitter=None):
+        self.logger = Logger()
+        self.update_manager = update_manager
+
+        # Import config settings, explicit arguments take precedence
+        try:
+            from config import (CACHE_UPDATE_INTERVAL, BACKGROUND_REFRESH_JITTER,
+                                BACKGROUND_REFRESH_ON_BATTERY, BACKGROUND_REFRESH_ON_METERED)
+        except ImportError:
+            CACHE_UPDATE_INTERVAL, BACKGROUND_REFRESH_JITTER = 3600, 600
+            BACKGROUND_REFRESH_ON_BATTERY, BACKGROUND_REFRESH_ON_METERED = False, False
+
+        self.interval = CACHE_UPDATE_INTERVAL if interval is None else interval
+        self.jitter = BACKGROUND_REFRESH_JITTER if jitter is None else jitter
+        self.refresh_on_battery = BACKGROUND_REFRESH_ON_BATTERY
+        self.refresh_on_metered = BACKGROUND_REFRESH_ON_METERED
+        self._source_id = None
+
+    def start(self):
+        """Schedule the first refresh"""
+        # Pick up where the last run left off so restarts don't refresh needlessly
+        age = self.update_manager.get_cached_updates_age()
+        remaining = max(self.interval - age, 0) if age is not None else 0
+        self._schedule(remaining)
+
+    def stop(self):
+        """Cancel the pending refresh"""
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+
+    def _schedule(self, delay):
+        """Schedule the next refresh after delay seconds plus random jitter"""
+        # Jitter spreads the requests of many machines over time so they don't hit the mirror at once
+        delay = int(delay + random.uniform(0, self.jitter))
+        self.logger.info(f"Next background refresh in {delay} seconds")
+        self._source_id = GLib.timeout_add_seconds(max(delay, 1), self._on_timeout)
+
+    def _on_timeout(self):
+        """Run a background refresh unless the conditions are unsuitable"""
+        self._source_id = None
+
+        if not self.refresh_on_battery and self._on_battery():
+            self.logger.info("Skipping background refresh: running on battery")
+        elif not self.refresh_on_metered and self._on_metered_network():
+            self.logger.info("Skipping background refresh: metered network connection")
+        else:
+            self.logger.info("Starting background refresh")
+            # Backends that need root to refresh rely on the system's timers (e.g. apt-daily) instead
+            self.update_manager.refresh_updates(unattended=True)
+
+        self._schedule(self.interval)
+        return False  # Each run schedules the next one with fresh jitter
+
+    def _on_battery(self):
+        """Check if the machine runs on battery power"""
+        try:
+            supplies = list(Path('/sys/class/power_supply').iterdir())
+            for supply in supplies:
+                kind = (supply / 'type').read_text().strip()
+                if kind == 'Mains' and (supply / 'online').read_text().strip() == '1':
+                    return False
+
+            # No mains adapter online: on battery only if a battery is discharging
+            for supply in supplies:
+                if (supply / 'type').read_text().strip() == 'Battery':
+                    if (supply / 'status').read_text().strip() == 'Discharging':
+                        return True
+            return False
+        except OSError:
+            return False
+
+    def _on_metered_network(self):
+        """Check if the current network connection is metered"""
+        try:
+            return Gio.NetworkMonitor.get_default().get_network_metered()
+        except Exception:
+            return False
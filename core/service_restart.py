@@ -0,0 +1,196 @@
+"""
+Service Restarts
+Finds services and programs still running replaced library versions and restarts services in one batch
+"""
+
+import fnmatch
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from utils.logger import Logger
+from .restart_impact import SHARED_LIBRARY, mapped_files
+
+# Only mappings of installed files count; memfd, shared memory and temporary files are deleted on purpose
+PACKAGED_PREFIXES = ('/usr/', '/lib', '/bin/', '/sbin/', '/opt/')
+
+# Units whose restart would end the session or cut off the system
+NEVER_RESTART = [
+    'dbus.service', 'dbus-broker.service', 'systemd-logind.service', 'display-manager.service',
+    'gdm.service', 'gdm3.service', 'sddm.service', 'lightdm.service',
+    'getty@*.service', 'serial-getty@*.service', 'user@*.service', 'user-runtime-dir@*.service'
+]
+
+# Privileged scan for users who cannot read the maps of system services
+CHECK_HELPER = '/usr/lib/guideos-updater/guideos-updater-check-services'
+
+def stale_files(proc, pid):
+    """Get the replaced files a process still has mapped, None if it cannot be read"""
+    files = mapped_files(proc, pid, deleted=True)
+    if files is None:
+        return None
+    return {path for path in files if path.startswith(PACKAGED_PREFIXES)}
+
+def ships_mapped_files(packages, info_dir='/var/lib/dpkg/info'):
+    """Check whether Debian packages contain shared libraries or programs, the files processes map"""
+    for package in packages:
+        # Multi-arch packages are listed as name:arch.list
+        lists = glob(f'{info_dir}/{package}.list') + glob(f'{info_dir}/{package}:*.list')
+        if not lists:
+            # Nothing to go by, so assume the worst
+            return True
+        for list_file in lists:
+            try:
+                with open(list_file, errors='surrogateescape') as f:
+                    for line in f:
+                        path = line.rstrip('\n')
+                        if not path.startswith(PACKAGED_PREFIXES):
+                            continue
+                        if SHARED_LIBRARY.search(path):
+                            return True
+                        mode = os.stat(path).st_mode
+                        if stat.S_ISREG(mode) and mode & 0o111:
+                            return True
+            except OSError:
+                continue
+    return False
+
+def process_unit(proc, pid):
+    """Get ('system' or 'user', unit) of a process started by systemd, or None"""
+    try:
+        with open(f'{proc}/{pid}/cgroup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    for line in lines:
+        # The unified hierarchy line looks like "0::/system.slice/cups.service"
+        if not line.startswith('0::'):
+            continue
+        parts = line[3:].split('/')
+        services = [part for part in parts if part.endswith('.service')]
+        if not services:
+            return None
+        if services[0].startswith('user@'):
+            return ('user', services[-1]) if len(services) > 1 else None
+        return ('system', services[-1])
+    return None
+
+def scan(proc='/proc', workers=8, uid=None, all_users=True):
+    """Find processes with replaced files mapped, reading the process maps in parallel
+
+    User services are those of uid (the current user by default); processes
+    outside of services are reported by program name, only those of uid
+    unless all_users is set. unreadable counts the processes of system
+    services whose maps could not be read.
+    """
+    uid = os.getuid() if uid is None else uid
+    pids = [pid for pid in os.listdir(proc) if pid.isdigit()]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda pid: stale_files(proc, pid), pids))
+
+    services, user_services, programs = set(), set(), set()
+    unreadable = 0
+    for pid, files in zip(pids, results):
+        if files is None:
+            # Processes of other users are not reported, only system services are worth a privileged scan
+            unit = process_unit(proc, pid)
+            if unit and unit[0] == 'system':
+                unreadable += 1
+            continue
+        if not files:
+            continue
+
+        try:
+            unit = process_unit(proc, pid)
+            if unit and unit[0] == 'system':
+                services.add(unit[1])
+                continue
+            owned = os.stat(f'{proc}/{pid}').st_uid == uid
+            if unit and owned:
+                user_services.add(unit[1])
+            elif owned or all_users:
+                with open(f'{proc}/{pid}/comm') as f:
+                    programs.add(f.read().strip())
+        except OSError:
+            # The process exited meanwhile
+            continue
+
+    return {
+        'services': sorted(services),
+        'user_services': sorted(user_services),
+        'programs': sorted(programs),
+        'unreadable': unreadable
+    }
+
+class ServiceRestarter:
+    """Post-install check for outdated processes, with batched service restarts"""
+
+    def __init__(self, proc='/proc'):
+        self.logger = Logger()
+        self.proc = proc
+
+    def check(self, packages=None):
+        """Get the services and programs to restart, excluding those never restarted automatically
+
+        packages are the installed Debian packages; the privileged scan is
+        skipped when none of them replaced a file a service could have mapped.
+        """
+        try:
+            result = scan(self.proc)
+            if (result['unreadable'] and os.geteuid() != 0
+                    and (packages is None or ships_mapped_files(packages))):
+                # System services are only visible to root
+                result = self._privileged_scan() or result
+        except OSError as e:
+            self.logger.warning(f"Could not check for outdated processes: {e}")
+            return {'services': [], 'user_services': [], 'programs': [], 'unreadable': 0}
+
+        for key in ('services', 'user_services'):
+            excluded = [unit for unit in result[key]
+                        if any(fnmatch.fnmatch(unit, pattern) for pattern in NEVER_RESTART)]
+            if excluded:
+                self.logger.info(f"Not restarting {', '.join(excluded)}")
+            result[key] = [unit for unit in result[key] if unit not in excluded]
+
+        self.logger.info(f"{len(result['services']) + len(result['user_services'])} services and "
+                         f"{len(result['programs'])} programs use replaced files")
+        return result
+
+    def restart(self, services, user_services=()):
+        """Restart system and user services, each set in one systemctl call"""
+        success = True
+        # systemd asks PolicyKit itself when system services are restarted by a user
+        for command, units in ((['systemctl', 'restart'], services),
+                               (['systemctl', '--user', 'restart'], user_services)):
+            if not units:
+                continue
+            self.logger.info(f"Restarting {', '.join(units)}")
+            result = subprocess.run(command + list(units), capture_output=True, text=True)
+            if result.returncode != 0:
+                self.logger.error(f"Could not restart {', '.join(units)}: {result.stderr.strip()}")
+                success = False
+        return success
+
+    def _privileged_scan(self):
+        """Run the scan as root through the helper, None if that is not possible"""
+        if not os.path.exists(CHECK_HELPER) or not shutil.which('pkexec'):
+            return None
+        try:
+            result = subprocess.run(['pkexec', CHECK_HELPER], capture_output=True, text=True, timeout=30)
+            if result.returncode == 0:
+                return json.loads(result.stdout)
+            self.logger.warning(f"Privileged service check failed: {result.stderr.strip()}")
+        except (subprocess.TimeoutExpired, ValueError) as e:
+            self.logger.warning(f"Privileged service check failed: {e}")
+        return None
+
+def main():
+    """Print the scan result as JSON, run by the privileged helper"""
+    # pkexec tells which user asked; besides system services only their own processes are reported
+    uid = int(os.environ.get('PKEXEC_UID', os.getuid()))
+    json.dump(scan(uid=uid, all_users=False), sys.stdout)
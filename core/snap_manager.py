@@ -0,0 +1,272 @@
+"""
+Snap Package Manager Interface
+Handles Snap package refreshes
+"""
+
+import re
+import shutil
+import subprocess
+import time
+from utils.logger import Logger
+from .metadata_cache import MetadataCache
+from .backends import Backend
+
+# Task states of a snapd change that are still running
+RUNNING_STATES = {'Do', 'Doing', 'Undo', 'Undoing'}
+FAILED_STATES = {'Error', 'Undone'}
+
+# Tasks of core, kernel and snapd refreshes wait in this state until the next reboot
+WAITING_STATE = 'Wait'
+
+class SnapManager(Backend):
+    """Manager for Snap package operations"""
+
+    name = 'snap'
+    label = 'Snap'
+    capabilities = frozenset({'batch-install', 'progress', 'preflight'})
+
+    # Seconds between checks of a running refresh
+    POLL_INTERVAL = 1.0
+
+    # Failed checks in a row tolerated, e.g. while snapd restarts after refreshing itself
+    MAX_FAILED_POLLS = 10
+
+    # Seconds after which a refresh is given up on
+    CHANGE_TIMEOUT = 3600
+
+    def __init__(self, metadata_cache=None, parent_window=None, command=None):
+        self.logger = Logger()
+
+        try:
+            from config import SNAP_COMMAND
+        except ImportError:
+            SNAP_COMMAND = 'snap'
+
+        # The command can point to a stub that prints fixture output
+        self.command = command or SNAP_COMMAND
+        self.metadata_cache = metadata_cache or MetadataCache()
+
+    def is_available(self):
+        """Check if snap is available on the system"""
+        return shutil.which(self.command) is not None
+
+    def get_updates(self, update_cache=True):
+        """Get list of available Snap refreshes"""
+        # snapd asks the store on every call, there is no local metadata to refresh
+        try:
+            self.logger.info("Checking for Snap updates...")
+
+            result = subprocess.run([self.command, 'refresh', '--list'],
+                                  capture_output=True, text=True)
+            if result.returncode != 0:
+                self.logger.error(f"Error getting Snap updates: {result.stderr.strip()}")
+                return []
+
+            # "All snaps up to date." goes to stderr, so stdout is empty then
+            refreshes = self._parse_table(result.stdout)
+            if not refreshes:
+                self.logger.info("Found 0 Snap updates")
+                return []
+
+            installed = {row['Name']: row for row in self._parse_table(self._run('list'))}
+            descriptions = self._get_descriptions(refreshes)
+
+            updates = []
+            for row in refreshes:
+                name = row['Name']
+                size_bytes = self._parse_size(row.get('Size'))
+                metadata = descriptions[name]
+                current = installed.get(name, {})
+
+                updates.append({
+                    'name': name,
+                    'current_version': current.get('Version', 'Unknown'),
+                    'new_version': row['Version'],
+                    'revision': row.get('Rev'),
+                    'source': 'snap',
+                    'type': 'application',
+                    'is_security': False,
+                    'origin': current.get('Tracking', ''),
+                    'first_seen': metadata['first_seen'],
+                    'description': metadata['description'] or "No description available",
+                    'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+                    'size_bytes': size_bytes
+                })
+
+            self.metadata_cache.commit()
+            self.logger.info(f"Found {len(updates)} Snap updates")
+            return updates
+
+        except Exception as e:
+            self.logger.error(f"Unexpected error in Snap manager: {e}")
+            return []
+
+    def group_updates(self, updates):
+        """All snaps are shown and refreshed together, as one snapd change"""
+        if not updates:
+            return []
+        sizes = [u['size_bytes'] for u in updates if u.get('size_bytes') is not None]
+        size_bytes = sum(sizes) if sizes else None
+        return [{
+            'name': self.label,
+            'source': 'snap',
+            'updates': updates,
+            'is_security': False,
+            'size': self._format_size(size_bytes) if size_bytes is not None else "Unknown",
+            'size_bytes': size_bytes
+        }]
+
+    def install_updates(self, updates, progress=None):
+        """Refresh several snaps in one snapd change, reporting its progress"""
+        names = [update['name'] for update in updates]
+        try:
+            self.logger.info(f"Refreshing snaps: {', '.join(names)}")
+
+            # snapd asks PolicyKit itself; --no-wait returns the change ID at once
+            result = subprocess.run([self.command, 'refresh', '--no-wait'] + names,
+                                  capture_output=True, text=True)
+            change_id = result.stdout.strip()
+            if result.returncode != 0 or not change_id.isdigit():
+                self.logger.error(f"Failed to refresh snaps: {result.stderr.strip()}")
+                return False
+
+            success = self._wait_for_change(change_id, updates, progress)
+            if success:
+                self.logger.info(f"Successfully refreshed {', '.join(names)}")
+            else:
+                self.logger.error(f"Snap refresh change {change_id} failed")
+            return success
+
+        except Exception as e:
+            self.logger.error(f"Error refreshing snaps {', '.join(names)}: {e}")
+            return False
+
+    def install_update(self, update):
+        """Refresh one snap"""
+        return self.install_updates([update])
+
+    def simulate_install(self, updates):
+        """Report the download size of the given refreshes"""
+        # Snaps stay compressed, the download is all the space a revision takes
+        return {
+            'download_size': sum(update.get('size_bytes') or 0 for update in updates),
+            'download_path': '/var/lib/snapd/snaps',
+            'installed_size': 0,
+            'installed_path': '/var/lib/snapd',
+            'errors': []
+        }
+
+    def _wait_for_change(self, change_id, updates, progress):
+        """Poll a change until all its tasks are finished, True if none failed"""
+        deadline = time.monotonic() + self.CHANGE_TIMEOUT
+        failed_polls = 0
+        while True:
+            tasks = self._parse_table(self._run('change', change_id))
+            if not tasks:
+                # snapd is briefly unreachable when a refresh restarts it
+                failed_polls += 1
+                if failed_polls >= self.MAX_FAILED_POLLS:
+                    self.logger.error(f"Could not check snap change {change_id}, giving up")
+                    return False
+            else:
+                failed_polls = 0
+                running = [task for task in tasks if task['Status'] in RUNNING_STATES]
+                if progress:
+                    # Task summaries name the snap, e.g. 'Download snap "firefox" (3358) ...'
+                    current = re.search(r'"([^"]+)"', running[0]['Summary']) if running else None
+                    progress((len(tasks) - len(running)) / len(tasks), current.group(1) if current else '')
+                
+                if not running:
+                    waiting = [task for task in tasks if task['Status'] == WAITING_STATE]
+                    if waiting:
+                        self._mark_needs_reboot(updates, waiting)
+                    return not any(task['Status'] in FAILED_STATES for task in tasks)
+            
+            if time.monotonic() > deadline:
+                self.logger.error(f"Snap change {change_id} did not finish within {self.CHANGE_TIMEOUT} "
+                                  f"seconds, see 'snap change {change_id}'")
+                return False
+            time.sleep(self.POLL_INTERVAL)
+
+    def _mark_needs_reboot(self, updates, waiting):
+        """Set needs_reboot on the updates whose tasks wait for a reboot"""
+        names = {match.group(1) for task in waiting
+                 for match in [re.search(r'"([^"]+)"', task['Summary'])] if match}
+        for update in updates:
+            # Tasks not naming a snap hold back the whole change
+            if not names or update['name'] in names:
+                update['needs_reboot'] = True
+        self.logger.info(f"Snap refresh finishes after a reboot: {', '.join(sorted(names)) or 'all snaps'}")
+
+    def _get_descriptions(self, refreshes):
+        """Get summary and first-seen time of the new revisions, asking the store only for unknown ones"""
+        descriptions = {}
+        missing = []
+        for row in refreshes:
+            metadata = self.metadata_cache.get('snap', row['Name'], row['Version'])
+            if metadata is None:
+                missing.append(row)
+            else:
+                descriptions[row['Name']] = metadata
+
+        if missing:
+            # One snap info call prints a YAML document per snap
+            summaries = {}
+            for document in self._run('info', *[row['Name'] for row in missing]).split('\n---\n'):
+                name = re.search(r'^name:\s*(.+)$', document, re.MULTILINE)
+                summary = re.search(r'^summary:\s*(.+)$', document, re.MULTILINE)
+                if name and summary:
+                    summaries[name.group(1).strip()] = summary.group(1).strip().strip('"\'')
+
+            for row in missing:
+                description = summaries.get(row['Name'])
+                first_seen = self.metadata_cache.put('snap', row['Name'], row['Version'], description=description,
+                                                     size=self._parse_size(row.get('Size')))
+                descriptions[row['Name']] = {'description': description, 'first_seen': first_seen}
+
+        return descriptions
+
+    def _run(self, *args):
+        """Get the output of a snap command, empty on failure"""
+        try:
+            result = subprocess.run([self.command, *args], capture_output=True, text=True)
+            return result.stdout
+        except OSError as e:
+            self.logger.warning(f"Could not run snap {args[0]}: {e}")
+            return ''
+
+    def _parse_table(self, output):
+        """Parse a table printed by snap into dicts keyed by the header"""
+        lines = [line for line in output.split('\n') if line.strip()]
+        if not lines:
+            return []
+
+        # Columns are aligned, but cells like "today at 14:31 UTC" contain spaces
+        columns = [(match.group(), match.start()) for match in re.finditer(r'\S+', lines[0])]
+        rows = []
+        for line in lines[1:]:
+            # Failed changes append their task log below a dotted line
+            if line.startswith('...'):
+                break
+            row = {}
+            for index, (name, start) in enumerate(columns):
+                end = columns[index + 1][1] if index + 1 < len(columns) else None
+                row[name] = line[start:end].strip()
+            rows.append(row)
+        return rows
+
+    def _parse_size(self, size_info):
+        """Parse a size like "250MB" as printed by snap into bytes"""
+        units = {'B': 1, 'kB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4}
+        match = re.fullmatch(r'([\d.]+)\s*([kMGT]?B)', size_info or '')
+        if not match:
+            return None
+        return int(float(match.group(1)) * units[match.group(2)])
+
+    def _format_size(self, bytes_size):
+        """Format size in human readable format"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if bytes_size < 1024.0:
+                return f"{bytes_size:.1f} {unit}"
+            bytes_size /= 1024.0
+        return f"{bytes_size:.1f} TB"
@@ -0,0 +1,103 @@
+"""
+Unattended Updates
+Installs security updates without a window, e.g. from a systemd timer
+"""
+
+import os
+import resource
+import sys
+import threading
+from .event_bus import DirectDispatcher
+from .policy import UpdatePolicy
+from .update_manager import UpdateManager
+from utils.logger import Logger
+
+# Peak memory of the updater process itself; apt and dpkg run as child processes
+MEMORY_BUDGET = 50 * 1024 * 1024
+
+class UnattendedUpgrade:
+    """Refreshes, selects the security updates and installs them in one transaction"""
+
+    def __init__(self, backends=None):
+        self.logger = Logger()
+
+        try:
+            from config import UNATTENDED_BACKENDS
+        except ImportError:
+            UNATTENDED_BACKENDS = ['apt']
+
+        # Without a main loop, events are handled in the worker threads that emit them
+        self.update_manager = UpdateManager(dispatcher=DirectDispatcher(),
+                                            backends=backends or UNATTENDED_BACKENDS)
+
+        # The block list of the update policy still applies, delays do not
+        self.policy = UpdatePolicy(dict(self.update_manager.policy.rules,
+                                        security_only=True, security_immediately=True))
+
+        self._done = threading.Event()
+        self._result = None
+        for event in ('refresh_complete', 'update_complete', 'preflight_failed'):
+            self.update_manager.add_callback(event, lambda *args, event=event: self._finish(event, args))
+
+    def run(self):
+        """Install the available security updates, True unless something failed"""
+        self.logger.info("Starting unattended security update")
+        self._wait(self.update_manager.refresh_updates, force_cache_update=True, unattended=True)
+
+        selected = self.policy.select(self.update_manager.updates)
+        if not selected:
+            self.logger.info("No security updates to install")
+            self._record_memory()
+            return True
+
+        self.logger.info(f"Installing {len(selected)} security updates: "
+                         f"{', '.join(update['name'] for update in selected)}")
+        event, args = self._wait(self.update_manager.install_updates, selected, recover=True, batch=True)
+
+        success = event == 'update_complete' and args[0]
+        if event == 'preflight_failed':
+            report = args[0]
+            self.logger.error(f"Security updates cannot be installed: held {report['held']}, "
+                              f"removals {report['removals']}, low space {report['low_space']}, "
+                              f"errors {report['errors']}")
+        elif args[1]:
+            self._log_restart_advice(args[1])
+        self._record_memory()
+        return success
+
+    def _wait(self, start, *args, **kwargs):
+        """Start an operation of the update manager and wait for its final event"""
+        self._done.clear()
+        start(*args, **kwargs)
+        self._done.wait()
+        return self._result
+
+    def _finish(self, event, args):
+        """Remember the final event of the running operation"""
+        self._result = (event, args)
+        self._done.set()
+
+    def _log_restart_advice(self, summary):
+        """Nobody sees a dialog, so reboots and restarts are left to the log"""
+        if summary.get('reboot_packages'):
+            self.logger.warning(f"Reboot required by {', '.join(summary['reboot_packages'])}")
+        services = summary.get('restart_services', []) + summary.get('restart_user_services', [])
+        if services:
+            self.logger.warning(f"Services using replaced libraries: {', '.join(services)}")
+
+    def _record_memory(self):
+        """Export the peak memory use of the run next to the other metrics"""
+        # ru_maxrss is in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        if peak > MEMORY_BUDGET:
+            self.logger.warning(f"Unattended run used {peak // (1024 * 1024)} MB, "
+                                f"more than the budget of {MEMORY_BUDGET // (1024 * 1024)} MB")
+        self.update_manager.metrics.set('unattended_peak_memory_bytes', peak)
+        self.update_manager.metrics.write()
+
+def main():
+    """Entry point of guideos-updater --unattended"""
+    if os.geteuid() != 0:
+        print("Error: --unattended must be run as root", file=sys.stderr)
+        return 1
+    return 0 if UnattendedUpgrade().run() else 1
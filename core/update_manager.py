@@ -1,142 +1,408 @@
 """
 Core Update Manager
-Handles APT and Flatpak update operations
+Handles update operations of all enabled backends
 """
 
+import os
 import subprocess
 import threading
 import json
 import time
-from gi.repository import GLib
-from .apt_manager import APTManager
-from .flatpak_manager import FlatpakManager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .backends import BackendRegistry
+from .metadata_cache import MetadataCache
+from .preflight import PreflightChecker
+from .policy import UpdatePolicy
+from .journal import TransactionJournal, update_key
+from .install_state import InstallCheckpoint
+from .restart_impact import RestartImpact
+from .service_restart import ServiceRestarter
+from .event_bus import EventBus, snapshot, thaw
+from .pipeline import Batcher
 from utils.logger import Logger
+from utils.metrics import Metrics
+
+# Progress weight of installing an update, in addition to its download size
+INSTALL_WEIGHT = 1024 * 1024
 
 class UpdateManager:
     """Central manager for handling updates from different sources"""
     
-    def __init__(self, parent_window=None):
+    def __init__(self, parent_window=None, dispatcher=None, backends=None):
         self.logger = Logger()
-        self.apt_manager = APTManager(parent_window)
-        self.flatpak_manager = FlatpakManager()
+        self.metadata_cache = MetadataCache()
+        
+        # Only the enabled backends are imported
+        try:
+            from config import UPDATE_BACKENDS
+        except ImportError:
+            UPDATE_BACKENDS = ['apt', 'flatpak', 'snap', 'fwupd']
+        self.backends = BackendRegistry().load(backends or UPDATE_BACKENDS, parent_window=parent_window,
+                                               metadata_cache=self.metadata_cache)
+        
+        self.preflight = PreflightChecker(self.backends)
+        self.policy = UpdatePolicy.load()
+        self.metrics = Metrics()
+        self.journal = TransactionJournal()
+        self.checkpoint = InstallCheckpoint()
+        self.restart_impact = RestartImpact()
+        self.service_restarter = ServiceRestarter()
         
-        self.updates = []
-        self.is_refreshing = False
-        self.callbacks = {
-            'updates_found': [],
-            'refresh_complete': [],
-            'update_progress': [],
-            'update_complete': []
-        }
+        # State shared with the GUI thread; replaced only as a whole under the lock
+        self._state_lock = threading.Lock()
+        self._updates = ()
+        self._is_refreshing = False
+        
+        try:
+            from config import CACHE_DIR
+        except ImportError:
+            CACHE_DIR = Path.home() / '.cache' / 'gup'
+        self.updates_cache_file = CACHE_DIR / 'updates.json'
+        
+        # Events go through the GLib main loop unless a headless dispatcher is given
+        self.events = EventBus(
+            ['updates_found', 'updates_streamed', 'refresh_complete', 'update_progress', 'update_complete',
+             'preflight_failed', 'services_restarted'],
+            dispatcher=dispatcher,
+            coalesce=['update_progress']
+        )
+    
+    @property
+    def updates(self):
+        """Immutable snapshot of the available updates"""
+        with self._state_lock:
+            return self._updates
+    
+    @property
+    def is_refreshing(self):
+        """Whether a refresh is running"""
+        with self._state_lock:
+            return self._is_refreshing
+    
+    def _set_updates(self, updates):
+        """Replace the available updates with a snapshot of the given list"""
+        frozen = snapshot(updates)
+        with self._state_lock:
+            self._updates = frozen
+        return frozen
     
     def add_callback(self, event, callback):
         """Add callback for specific events"""
-        if event in self.callbacks:
-            self.callbacks[event].append(callback)
+        self.events.subscribe(event, callback)
     
     def emit_signal(self, event, *args):
         """Emit signal to all registered callbacks"""
-        if event in self.callbacks:
-            for callback in self.callbacks[event]:
-                GLib.idle_add(callback, *args)
+        self.events.emit(event, *args)
     
-    def refresh_updates(self, force_cache_update=True):
-        """Refresh available updates from all sources"""
-        if self.is_refreshing:
-            return
-        
-        self.is_refreshing = True
-        self.updates = []
+    def set_parent_window(self, window):
+        """Set the window authentication dialogs of all backends belong to"""
+        for backend in self.backends.values():
+            backend.set_parent_window(window)
+    
+    def get_sources(self):
+        """Names and labels of the enabled backends"""
+        return [(name, backend.label or name) for name, backend in self.backends.items()]
+    
+    def refresh_updates(self, force_cache_update=True, unattended=False):
+        """Refresh available updates from all sources in parallel"""
+        with self._state_lock:
+            if self._is_refreshing:
+                return
+            self._is_refreshing = True
         
         def refresh_thread():
             try:
                 self.logger.info("Refreshing update information...")
+                updates = []
+                
+                # Records of streaming backends reach the window in batches before the refresh ends
+                streamed = Batcher(lambda batch: self.emit_signal('updates_streamed', snapshot(batch)))
+                
+                # Backends wait on different processes and servers, so they refresh side by side
+                with ThreadPoolExecutor(max_workers=max(len(self.backends), 1)) as pool:
+                    futures = [pool.submit(self._refresh_backend, backend, force_cache_update, unattended,
+                                           streamed.add)
+                               for backend in self.backends.values()]
+                    for future in futures:
+                        updates.extend(future.result())
+                streamed.flush()
                 
-                # Refresh APT updates (this will automatically update the cache)
-                apt_updates = self.apt_manager.get_updates()
-                self.updates.extend(apt_updates)
+                # Which updates need a reboot or running programs restarted
+                try:
+                    self.restart_impact.annotate(updates)
+                except Exception as e:
+                    self.logger.warning(f"Could not determine restart impact: {e}")
                 
-                # Refresh Flatpak updates
-                flatpak_updates = self.flatpak_manager.get_updates()
-                self.updates.extend(flatpak_updates)
+                frozen = self._set_updates(updates)
+                self.logger.info(f"Found {len(frozen)} available updates")
+                self._save_cached_updates(frozen)
+                self.emit_signal('updates_found', frozen)
                 
-                self.logger.info(f"Found {len(self.updates)} available updates")
-                self.emit_signal('updates_found', self.updates)
+                self.metrics.record_pending(self.get_update_count())
+                self.metrics.set('last_refresh_timestamp_seconds', int(time.time()))
+                self.metrics.write()
                 
             except Exception as e:
                 self.logger.error(f"Error refreshing updates: {e}")
             finally:
-                self.is_refreshing = False
+                with self._state_lock:
+                    self._is_refreshing = False
                 self.emit_signal('refresh_complete')
         
         thread = threading.Thread(target=refresh_thread)
         thread.daemon = True
         thread.start()
     
+    def _refresh_backend(self, backend, update_cache, unattended, found=None):
+        """Get the updates of one backend"""
+        # Unattended refreshes must not ask for a password; root is never asked
+        if unattended and 'privileged-refresh' in backend.capabilities and os.geteuid() != 0:
+            update_cache = False
+        
+        with self.metrics.timer('refresh_duration_seconds', source=backend.name):
+            try:
+                if found and 'streaming' in backend.capabilities:
+                    return backend.get_updates(update_cache=update_cache, found=found)
+                return backend.get_updates(update_cache=update_cache)
+            except Exception as e:
+                self.logger.error(f"Error refreshing {backend.name} updates: {e}")
+                return []
+    
+    def _save_cached_updates(self, updates):
+        """Store the update list so it can be shown without waiting"""
+        try:
+            temporary = self.updates_cache_file.with_suffix('.tmp')
+            with open(temporary, 'w') as f:
+                json.dump({'timestamp': time.time(), 'updates': thaw(updates)}, f)
+            temporary.replace(self.updates_cache_file)
+        except Exception as e:
+            self.logger.warning(f"Could not save update list: {e}")
+    
+    def get_cached_updates_age(self):
+        """Get the age in seconds of the stored update list, or None if there is none"""
+        try:
+            with open(self.updates_cache_file) as f:
+                return max(time.time() - json.load(f)['timestamp'], 0)
+        except Exception:
+            return None
+    
+    def load_cached_updates(self, max_age=None):
+        """Load the stored update list if it is not older than max_age seconds"""
+        if max_age is None:
+            try:
+                from config import CACHE_UPDATE_INTERVAL as max_age
+            except ImportError:
+                max_age = 3600
+        
+        try:
+            with open(self.updates_cache_file) as f:
+                cached = json.load(f)
+            if time.time() - cached['timestamp'] > max_age:
+                return None
+            
+            updates = self._set_updates(cached['updates'])
+            self.logger.info(f"Loaded {len(updates)} updates from the last refresh")
+            return updates
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Could not load stored update list: {e}")
+            return None
+    
     def update_package_cache(self):
         """Explicitly update package cache from all sources"""
         try:
             self.logger.info("Updating package caches...")
             
-            # Update APT cache
-            apt_success = self.apt_manager._update_package_cache()
-            
-            # Update Flatpak cache (if needed)
-            flatpak_success = self.flatpak_manager.update_cache() if hasattr(self.flatpak_manager, 'update_cache') else True
-            
-            return apt_success and flatpak_success
+            results = [backend.update_cache() for backend in self.backends.values()]
+            return all(results)
             
         except Exception as e:
             self.logger.error(f"Error updating package caches: {e}")
             return False
     
-    def install_updates(self, selected_updates):
-        """Install selected updates"""
+    def install_updates(self, selected_updates, recover=False, batch=False):
+        """Install selected updates, recovering an interrupted dpkg run first if requested"""
+        # The worker gets its own copy; the caller may keep changing its selection, and
+        # backends note results on the records (e.g. needs_reboot)
+        selected_updates = thaw(selected_updates)
+        
         def install_thread():
+            transaction = None
             try:
-                self.logger.info(f"Installing {len(selected_updates)} updates...")
+                # The stored update list is outdated as soon as anything gets installed
+                self.updates_cache_file.unlink(missing_ok=True)
                 
-                # Separate APT and Flatpak updates
-                apt_updates = [update for update in selected_updates if update['source'] == 'apt']
-                flatpak_updates = [update for update in selected_updates if update['source'] == 'flatpak']
+                # Updates per backend, in the order the backends are configured
+                by_backend = {}
+                for update in selected_updates:
+                    by_backend.setdefault(update['source'], []).append(update)
+                backends = [(self.backends[name], by_backend[name]) for name in self.backends if name in by_backend]
+                
+                for backend, updates in backends:
+                    # E.g. half-configured packages would make apt refuse to work
+                    if recover and not backend.recover_interrupted():
+                        self.logger.warning(f"{backend.name} recovery failed, trying to install anyway")
+                    
+                    # E.g. root's package lists must match the lists the updates were found in
+                    if not backend.prepare_install():
+                        self.logger.warning(f"Could not prepare {backend.name} installation, installing anyway")
+                
+                # Simulate the whole selection once before downloading anything
+                report = self.preflight.check(selected_updates)
+                if not report['ok']:
+                    self.emit_signal('preflight_failed', report)
+                    return
+                
+                self.logger.info(f"Installing {len(selected_updates)} updates...")
                 
-                total_updates = len(selected_updates)
+                # Progress is weighted by download size, large updates take longer
+                total_weight = sum(self._progress_weight(update) for update in selected_updates)
                 completed = 0
+                transaction = self.journal.begin(selected_updates)
+                self.checkpoint.start(transaction.id, selected_updates)
                 
-                # Install APT updates
-                for update in apt_updates:
-                    self.apt_manager.install_update(update)
-                    completed += 1
-                    progress = (completed / total_updates) * 100
-                    self.emit_signal('update_progress', progress, update['name'])
+                # Updates of disabled backends (e.g. from an older checkpoint) can't be installed
+                unsupported = [update for update in selected_updates if update['source'] not in self.backends]
+                if unsupported:
+                    now = time.time()
+                    transaction.record(unsupported, now, now, False)
+                    completed += sum(self._progress_weight(update) for update in unsupported)
                 
-                # Install Flatpak updates
-                for update in flatpak_updates:
-                    self.flatpak_manager.install_update(update)
-                    completed += 1
-                    progress = (completed / total_updates) * 100
-                    self.emit_signal('update_progress', progress, update['name'])
+                # Install each group (e.g. all binaries of a source package) in one run
+                for backend, updates in backends:
+                    # A batch is one transaction per backend, e.g. one apt run for all packages
+                    if batch and 'batch-install' in backend.capabilities:
+                        groups = [{'name': backend.label or backend.name, 'updates': updates}]
+                    else:
+                        groups = backend.group_updates(updates)
+                    for group in groups:
+                        weight = sum(self._progress_weight(update) for update in group['updates'])
+                        
+                        def report_progress(fraction, name, done=completed, weight=weight):
+                            self.emit_signal('update_progress', (done + fraction * weight) / total_weight * 100, name)
+                        
+                        started = time.time()
+                        success = backend.install_updates(group['updates'], progress=report_progress)
+                        transaction.record(group['updates'], started, time.time(), success)
+                        if success:
+                            self.checkpoint.mark_done(group['updates'])
+                        completed += weight
+                        progress = (completed / total_weight) * 100
+                        self.emit_signal('update_progress', progress, group['name'])
                 
-                self.logger.info("All updates installed successfully")
-                self.emit_signal('update_complete', True)
+                summary = transaction.finish()
+                self.checkpoint.finish()
                 
             except Exception as e:
                 self.logger.error(f"Error installing updates: {e}")
-                self.emit_signal('update_complete', False)
+                if transaction is None:
+                    self.emit_signal('update_complete', False, None)
+                    return
+                summary = transaction.finish(error=e)
+            
+            installed_keys = set(transaction.installed)
+            installed = [update for update in selected_updates if update_key(update) in installed_keys]
+            summary.update(self.restart_impact.summarize(installed))
+            self._check_services(installed, summary)
+            
+            self._record_install_metrics(summary)
+            if summary['success']:
+                self.logger.info("All updates installed successfully")
+            else:
+                self.logger.error(f"{len(summary['failed'])} of {summary['total']} updates failed: "
+                                  f"{', '.join(summary['failed'])}")
+            self.emit_signal('update_complete', summary['success'], summary)
         
         thread = threading.Thread(target=install_thread)
         thread.daemon = True
         thread.start()
     
-    def get_update_count(self):
-        """Get count of available updates by type"""
-        apt_count = len([u for u in self.updates if u['source'] == 'apt'])
-        flatpak_count = len([u for u in self.updates if u['source'] == 'flatpak'])
-        security_count = len([u for u in self.updates if u.get('is_security', False)])
+    def _progress_weight(self, update):
+        """Share of an update in the installation progress"""
+        # Unpacking and configuring weighs like a download of INSTALL_WEIGHT bytes
+        return (update.get('size_bytes') or 0) + INSTALL_WEIGHT
+    
+    def _check_services(self, installed, summary):
+        """Add the services and programs still running replaced libraries to an install summary"""
+        summary['restart_services'] = []
+        summary['restart_user_services'] = []
+        # Only system packages replace libraries of running processes
+        packages = [update['name'] for update in installed if update['source'] == 'apt']
+        if not packages:
+            return
         
-        return {
-            'total': len(self.updates),
-            'apt': apt_count,
-            'flatpak': flatpak_count,
-            'security': security_count
-        }
\ No newline at end of file
+        result = self.service_restarter.check(packages)
+        summary['restart_services'] = result['services']
+        summary['restart_user_services'] = result['user_services']
+        summary['restart_programs'] = sorted(set(summary.get('restart_programs', [])) | set(result['programs']))
+    
+    def restart_services(self, services, user_services=()):
+        """Restart services after an installation in the background"""
+        def restart_thread():
+            success = self.service_restarter.restart(services, user_services)
+            self.emit_signal('services_restarted', success)
+        
+        thread = threading.Thread(target=restart_thread)
+        thread.daemon = True
+        thread.start()
+    
+    def get_interrupted_install(self):
+        """Get the checkpoint of an installation that did not run to the end, or None"""
+        return self.checkpoint.load()
+    
+    def resume_install(self):
+        """Recover and install only the updates an interrupted installation left over"""
+        state = self.checkpoint.load()
+        if state is None:
+            return False
+        
+        self.logger.info(f"Resuming interrupted installation {state['transaction']}: "
+                         f"{len(state['remaining'])} of {len(state['updates'])} updates remaining")
+        self.install_updates(state['remaining'], recover=True)
+        return True
+    
+    def discard_interrupted_install(self):
+        """Forget an interrupted installation"""
+        self.checkpoint.finish()
+    
+    def _record_install_metrics(self, summary):
+        """Export the outcome of an installation"""
+        self.metrics.set('install_duration_seconds', summary['duration'])
+        self.metrics.set('install_updates', summary['total'])
+        self.metrics.set('install_failures', summary['total'] - summary['installed'])
+        self.metrics.set('last_install_timestamp_seconds', int(time.time()))
+        self.metrics.write()
+    
+    def select_updates(self, updates, quiet=False):
+        """Get the updates that should be selected for installation by default"""
+        try:
+            from config import AUTO_SELECT_ALL_UPDATES
+        except ImportError:
+            AUTO_SELECT_ALL_UPDATES = True
+        if not AUTO_SELECT_ALL_UPDATES:
+            return []
+        
+        selected = self.policy.select(updates)
+        if len(selected) < len(updates) and not quiet:
+            self.logger.info(f"Update policy selected {len(selected)} of {len(updates)} updates")
+        return selected
+    
+    def group_updates(self, updates):
+        """Group updates for display the way each backend installs them"""
+        groups = []
+        for name, backend in self.backends.items():
+            groups.extend(backend.group_updates([u for u in updates if u['source'] == name]))
+        return groups
+    
+    def get_update_count(self):
+        """Get count of available updates in total, per backend and of security updates"""
+        updates = self.updates
+        counts = {'total': len(updates), 'security': 0}
+        counts.update((name, 0) for name in self.backends)
+        for update in updates:
+            counts[update['source']] = counts.get(update['source'], 0) + 1
+            if update.get('is_security', False):
+                counts['security'] += 1
+        return counts
\ No newline at end of file
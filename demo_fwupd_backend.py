@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Demo for the firmware backend
+Runs FwupdManager against a stub fwupdmgr that prints fixture JSON
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_dir)
+
+from core.fwupd_manager import FwupdManager
+from core.metadata_cache import MetadataCache
+from core.repo_probe import RepositoryProbe
+
+FIXTURE = {
+    'Devices': [
+        {
+            'Name': 'System Firmware',
+            'DeviceId': '3c4e1d9a8f0b2c6e7d5a4b3c2d1e0f9a8b7c6d5e',
+            'Version': '0.1.12',
+            'Flags': ['internal', 'updatable', 'needs-reboot'],
+            'Releases': [{
+                'AppstreamId': 'com.example.laptop.firmware',
+                'RemoteId': 'lvfs',
+                'Version': '0.1.14',
+                'Summary': 'Firmware for the Example Laptop',
+                'Description': '<p>Fixes a boot hang.</p><ul><li>Security fix for CVE-2024-0001</li></ul>',
+                'Size': 17825792,
+                'Urgency': 'high',
+                'Issues': ['CVE-2024-0001']
+            }]
+        },
+        {
+            'Name': 'USB Receiver',
+            'DeviceId': 'b1a2c3d4e5f60718293a4b5c6d7e8f9012345678',
+            'Version': 'RQR12.07',
+            'Flags': ['updatable'],
+            'Releases': [{
+                'AppstreamId': 'com.example.receiver.firmware',
+                'RemoteId': 'lvfs',
+                'Version': 'RQR12.11',
+                'Summary': 'Firmware for the USB receiver',
+                'Size': 34816,
+                'Urgency': 'medium'
+            }]
+        }
+    ]
+}
+
+STUB = '''#!{python}
+import sys
+with open({log!r}, 'a') as f:
+    f.write(' '.join(sys.argv[1:]) + '\\n')
+if sys.argv[1] == 'get-updates':
+    print(open({fixture!r}).read())
+elif sys.argv[1] == 'get-remotes':
+    print('{{"Remotes": []}}')
+'''
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fixture = tmp / 'updates.json'
+        fixture.write_text(json.dumps(FIXTURE))
+        log = tmp / 'calls.log'
+        stub = tmp / 'fwupdmgr'
+        stub.write_text(STUB.format(python=sys.executable, log=str(log), fixture=str(fixture)))
+        stub.chmod(0o755)
+
+        manager = FwupdManager(metadata_cache=MetadataCache(path=tmp / 'metadata.db'), command=str(stub))
+        manager.repo_probe = RepositoryProbe('fwupd', state_dir=tmp)
+
+        updates = manager.get_updates()
+        for update in updates:
+            flags = ', '.join(flag for flag, on in [('security', update['is_security']),
+                                                    ('reboot', update['needs_reboot'])] if on)
+            print(f"{update['name']:<18} {update['current_version']} -> {update['new_version']:<10} "
+                  f"{update['size']:>9}  {flags}")
+
+        print(f"Preflight:    {manager.simulate_install(updates)['download_size']} bytes to download")
+        print(f"Installed:    {manager.install_updates(updates)}")
+        print("Stub calls:")
+        print(log.read_text(), end='')
+
+if __name__ == "__main__":
+    main()
@@ -78,10 +78,10 @@ if __name__ == "__main__":
     
     installed_packages = set()
     
-    def demo_apt_updates(self):
+    def demo_apt_updates(self, update_cache=True, found=None):
         return [u for u in demo_updates if u['name'] not in installed_packages]
     
-    def demo_flatpak_updates(self):
+    def demo_flatpak_updates(self, update_cache=True, found=None):
         return []  # Keine Flatpak-Updates für diese Demo
     
     def demo_apt_install(self, update):
@@ -95,6 +95,7 @@ if __name__ == "__main__":
     APTManager.get_updates = demo_apt_updates
     FlatpakManager.get_updates = demo_flatpak_updates
     APTManager.install_update = demo_apt_install
+    APTManager.install_updates = lambda self, updates, progress=None: all([self.install_update(u) for u in updates])
     
     print("\n🎬 Starte GUP Demo mit PolicyKit...")
     print("💡 Das Passwort-Fenster kommt vom System (PolicyKit)")
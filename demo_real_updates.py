@@ -84,10 +84,10 @@ if __name__ == "__main__":
         from core.apt_manager import APTManager
         from core.flatpak_manager import FlatpakManager
         
-        def real_apt_updates(self):
+        def real_apt_updates(self, update_cache=True, found=None):
             return real_updates
         
-        def real_flatpak_updates(self):
+        def real_flatpak_updates(self, update_cache=True, found=None):
             # Try to get real Flatpak updates
             try:
                 result = subprocess.run(['flatpak', 'remote-ls', '--updates'], 
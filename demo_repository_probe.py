@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Demo for conditional repository refreshes
+Compares a full metadata download with the conditional probe against a local HTTP repository
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_dir)
+
+from core.repo_probe import RepositoryProbe
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Static file handler that counts the bytes it sends"""
+
+    bytes_sent = 0
+
+    def setup(self):
+        super().setup()
+        write = self.wfile.write
+
+        def counting_write(data):
+            CountingHandler.bytes_sent += len(data)
+            return write(data)
+
+        self.wfile.write = counting_write
+
+    def log_message(self, format, *args):
+        pass
+
+def measure(action):
+    """Run action and return (result, bytes sent by the server, seconds)"""
+    CountingHandler.bytes_sent = 0
+    start = time.perf_counter()
+    result = action()
+    return result, CountingHandler.bytes_sent, time.perf_counter() - start
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # A small repository: signed release file, package index and a Flatpak-style summary
+        files = {
+            'debian/dists/stable/InRelease': 150 * 1024,
+            'debian/dists/stable/main/binary-amd64/Packages.xz': 9 * 1024 * 1024,
+            'flatpak/summary': 4 * 1024 * 1024,
+        }
+        for name, size in files.items():
+            path = tmp / 'repo' / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(os.urandom(size))
+
+        handler = partial(CountingHandler, directory=str(tmp / 'repo'))
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/{name}" for name in files]
+        probe_urls = [url for url in urls if not url.endswith('Packages.xz')]
+
+        def full_refresh():
+            for url in urls:
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+
+        probe = RepositoryProbe('demo', state_dir=tmp / 'state')
+
+        _, full_bytes, full_time = measure(full_refresh)
+        changed, _, _ = measure(lambda: probe.check(probe_urls))
+        probe.commit()
+        unchanged, probe_bytes, probe_time = measure(lambda: probe.check(probe_urls))
+
+        print(f"Full refresh:       {full_bytes:>10} bytes  {full_time * 1000:7.1f} ms")
+        print(f"Conditional probe:  {probe_bytes:>10} bytes  {probe_time * 1000:7.1f} ms")
+        print(f"First probe reported changes: {changed}, second probe: {unchanged}")
+
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Demo for the shared download cache
+Serves a cache directory over a local HTTP stand-in and fetches from it like a peer,
+then imports the verified archives into a stand-in for apt's cache the way root does
+"""
+
+import sys
+import os
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_dir)
+
+from core.download_cache import DownloadCache
+from core.archive_verify import import_archives
+
+def make_update(name):
+    return {'name': name, 'new_version': '1:2.0-1', 'architecture': 'amd64', 'source': 'apt'}
+
+def main():
+    updates = [make_update(name) for name in ('demo-package', 'demo-cached', 'demo-tampered', 'demo-corrupt')]
+    filenames = [DownloadCache.archive_filename(update) for update in updates]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        peer_dir = tmp / 'peer'
+        apt_dir = tmp / 'apt-archives'
+        peer_dir.mkdir()
+        apt_dir.mkdir()
+
+        # What the package index says about each archive
+        checksums = {}
+        for filename in filenames:
+            data = b'!<arch>\n' + os.urandom(64 * 1024)
+            checksums[filename] = (len(data), hashlib.sha256(data).hexdigest())
+            # Same size, different content: apt alone would accept these
+            broken = data[:-1] + b'\0'
+            if filename.startswith('demo-tampered'):
+                (peer_dir / filename).write_bytes(broken)
+            elif filename.startswith('demo-corrupt'):
+                (peer_dir / filename).write_bytes(data)
+                (apt_dir / filename).write_bytes(broken)
+            else:
+                (peer_dir / filename).write_bytes(data)
+                if filename.startswith('demo-cached'):
+                    (apt_dir / filename).write_bytes(data)
+
+        # Peer machine: publishes its archives over HTTP
+        server = DownloadCache(enabled=True, cache_dir=peer_dir).serve(port=0, bind='127.0.0.1')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        peer_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        # Local machine: no shared directory, only the peer
+        client = DownloadCache(enabled=True, cache_dir=tmp / 'shared', peers=[peer_url],
+                               publish=True, staging_dir=tmp / 'staging')
+        client.system_dir = apt_dir
+        imports = client.prepare_apt(updates, checksums)
+        print(f"To import:    {', '.join(imports)}")
+
+        # Root's part: verify copies inside apt's cache, drop corrupt archives there
+        import_archives(tmp / 'staging', imports, checksums, archives_dir=apt_dir)
+        print(f"Staging:      {client.clear_staging()} archive(s) removed after the import")
+        for filename in filenames:
+            print(f"apt's cache:  {filename}: {'present' if (apt_dir / filename).exists() else 'apt downloads it'}")
+        print(f"apt options:  {' '.join(client.apt_options())}")
+        print(f"Published:    {client.publish_apt(filenames)} archive(s) to {tmp / 'shared'}")
+
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
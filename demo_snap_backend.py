@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Demo for the Snap backend
+Runs SnapManager against a stub snap binary that prints fixture output
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_dir)
+
+from core.snap_manager import SnapManager
+from core.metadata_cache import MetadataCache
+
+REFRESH_LIST = """\
+Name      Version        Rev   Size   Publisher     Notes
+firefox   131.0.3-1      5134  283MB  mozilla✓      -
+core22    20241001       1663  77MB   canonical✓    base
+"""
+
+SNAP_LIST = """\
+Name      Version        Rev   Tracking       Publisher     Notes
+core22    20240904       1621  latest/stable  canonical✓    base
+firefox   130.0.1-1      5014  latest/stable  mozilla✓      -
+"""
+
+SNAP_INFO = """\
+name:      firefox
+summary:   Mozilla Firefox web browser
+publisher: Mozilla✓
+---
+name:      core22
+summary:   Runtime environment based on Ubuntu 22.04
+publisher: Canonical✓
+"""
+
+# The change advances one task per poll; the second poll fails like while snapd restarts,
+# and tasks marked "Wait:" end waiting for a reboot
+CHANGE_TASKS = [
+    'Download snap "core22" (1663) from channel "latest/stable"',
+    'Wait:Mount snap "core22" (1663)',
+    'Download snap "firefox" (5134) from channel "latest/stable"',
+    'Mount snap "firefox" (5134)',
+    'Automatically connect eligible plugs and slots of snap "firefox"',
+]
+
+STUB = '''#!{python}
+import sys
+from pathlib import Path
+directory = Path({directory!r})
+args = sys.argv[1:]
+with open(directory / 'calls.log', 'a') as f:
+    f.write(' '.join(args) + '\\n')
+if args[:2] == ['refresh', '--list']:
+    print((directory / 'refresh-list.txt').read_text(), end='')
+elif args[:2] == ['refresh', '--no-wait']:
+    print('17')
+elif args[0] in ('list', 'info'):
+    print((directory / (args[0] + '.txt')).read_text(), end='')
+elif args[0] == 'change':
+    polls = directory / 'polls'
+    done = int(polls.read_text()) if polls.exists() else 0
+    polls.write_text(str(done + 1))
+    if done == 1:
+        sys.exit('error: cannot communicate with server: connection refused')
+    done = max(done - 1, 0)
+    tasks = (directory / 'tasks.txt').read_text().splitlines()
+    print('Status  Spawn               Ready               Summary')
+    for index, summary in enumerate(tasks):
+        final = 'Wait' if summary.startswith('Wait:') else 'Done'
+        summary = summary.split(':', 1)[1] if summary.startswith('Wait:') else summary
+        status = final if index < done else 'Doing' if index == done else 'Do'
+        ready = 'today at 14:31 UTC' if index < done else '-'
+        print(f'{{status:<6}}  today at 14:30 UTC  {{ready:<18}}  {{summary}}')
+'''
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'refresh-list.txt').write_text(REFRESH_LIST)
+        (tmp / 'list.txt').write_text(SNAP_LIST)
+        (tmp / 'info.txt').write_text(SNAP_INFO)
+        (tmp / 'tasks.txt').write_text('\n'.join(CHANGE_TASKS))
+        stub = tmp / 'snap'
+        stub.write_text(STUB.format(python=sys.executable, directory=str(tmp)))
+        stub.chmod(0o755)
+
+        manager = SnapManager(metadata_cache=MetadataCache(path=tmp / 'metadata.db'), command=str(stub))
+        manager.POLL_INTERVAL = 0.05
+
+        updates = manager.get_updates()
+        for update in updates:
+            print(f"{update['name']:<10} {update['current_version']} -> {update['new_version']:<12} "
+                  f"{update['size']:>9}  {update['description']}")
+
+        print(f"Preflight:    {manager.simulate_install(updates)['download_size']} bytes to download")
+        success = manager.install_updates(
+            updates, progress=lambda fraction, name: print(f"  {fraction:4.0%}  {name}"))
+        print(f"Installed:    {success}")
+        print(f"Reboot:       {', '.join(u['name'] for u in updates if u.get('needs_reboot')) or 'none'}")
+        print("Stub calls:")
+        calls = (tmp / 'calls.log').read_text().splitlines()
+        print('\n'.join(call for call in calls if call != 'change 17'))
+        print(f"change 17 (polled {calls.count('change 17')} times)")
+
+if __name__ == "__main__":
+    main()
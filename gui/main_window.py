@@ -9,6 +9,7 @@ from gi.repository import Gtk, Adw, GLib, Gdk, Notify
 
 from utils.logger import Logger
 from utils.i18n import _
+from gui.update_list import UpdateList
 
 class MainWindow:
     """Main window class for the update manager GUI"""
@@ -44,10 +45,14 @@ class MainWindow:
     
     def _connect_update_manager_signals(self):
         """Connect to update manager signals"""
+        self.update_list.set_sources(self.update_manager.get_sources())
         self.update_manager.add_callback('updates_found', self._on_updates_found)
+        self.update_manager.add_callback('updates_streamed', self._on_updates_streamed)
         self.update_manager.add_callback('refresh_complete', self._on_refresh_complete)
         self.update_manager.add_callback('update_progress', self._on_update_progress)
         self.update_manager.add_callback('update_complete', self._on_update_complete)
+        self.update_manager.add_callback('preflight_failed', self._on_preflight_failed)
+        self.update_manager.add_callback('services_restarted', self._on_services_restarted)
     
     def _create_ui(self):
         """Create the user interface"""
@@ -129,7 +134,16 @@ class MainWindow:
     
     def _create_content_area(self, parent):
         """Create main content area with update list"""
-        # Scrolled window for the tree view
+        self.update_list = UpdateList(on_selection_changed=self._update_selected_updates)
+        
+        # Search entry and quick filters
+        filter_bar = self.update_list.create_filter_bar()
+        filter_bar.set_margin_start(10)
+        filter_bar.set_margin_end(10)
+        filter_bar.set_margin_top(10)
+        parent.append(filter_bar)
+        
+        # Scrolled window for the column view
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         scrolled.set_vexpand(True)
@@ -139,66 +153,9 @@ class MainWindow:
         scrolled.set_margin_top(10)
         scrolled.set_margin_bottom(10)
         
-        # Create tree view for updates
-        self.tree_view = Gtk.TreeView()
-        self.tree_view.set_headers_visible(True)
-        self.tree_view.set_headers_clickable(True)
-        
-        # Create list store (columns: selected, name, current_version, new_version, source, type, size)
-        self.list_store = Gtk.ListStore(bool, str, str, str, str, str, str, object)
-        self.tree_view.set_model(self.list_store)
-        
-        # Create columns
-        self._create_columns()
-        
-        scrolled.set_child(self.tree_view)
+        scrolled.set_child(self.update_list.column_view)
         parent.append(scrolled)
     
-    def _create_columns(self):
-        """Create columns for the tree view"""
-        # Selection column
-        renderer_toggle = Gtk.CellRendererToggle()
-        renderer_toggle.connect("toggled", self._on_update_toggled)
-        column_select = Gtk.TreeViewColumn(_("Select"), renderer_toggle, active=0)
-        self.tree_view.append_column(column_select)
-        
-        # Package name column
-        renderer_text = Gtk.CellRendererText()
-        column_name = Gtk.TreeViewColumn(_("Package"), renderer_text, text=1)
-        column_name.set_resizable(True)
-        column_name.set_min_width(200)
-        self.tree_view.append_column(column_name)
-        
-        # Current version column
-        renderer_text = Gtk.CellRendererText()
-        column_current = Gtk.TreeViewColumn(_("Current Version"), renderer_text, text=2)
-        column_current.set_resizable(True)
-        self.tree_view.append_column(column_current)
-        
-        # New version column
-        renderer_text = Gtk.CellRendererText()
-        column_new = Gtk.TreeViewColumn(_("New Version"), renderer_text, text=3)
-        column_new.set_resizable(True)
-        self.tree_view.append_column(column_new)
-        
-        # Source column
-        renderer_text = Gtk.CellRendererText()
-        column_source = Gtk.TreeViewColumn(_("Source"), renderer_text, text=4)
-        column_source.set_resizable(True)
-        self.tree_view.append_column(column_source)
-        
-        # Type column
-        renderer_text = Gtk.CellRendererText()
-        column_type = Gtk.TreeViewColumn(_("Type"), renderer_text, text=5)
-        column_type.set_resizable(True)
-        self.tree_view.append_column(column_type)
-        
-        # Size column
-        renderer_text = Gtk.CellRendererText()
-        column_size = Gtk.TreeViewColumn(_("Size"), renderer_text, text=6)
-        column_size.set_resizable(True)
-        self.tree_view.append_column(column_size)
-    
     def _create_button_area(self, parent):
         """Create button area at bottom"""
         button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
@@ -244,12 +201,51 @@ class MainWindow:
         self.window.present()
         # Start initial refresh (only if update_manager is available)
         if self.update_manager:
+            # An installation that was cut off is offered for resuming first
+            interrupted = self.update_manager.get_interrupted_install()
+            if interrupted is not None:
+                self._show_resume_dialog(interrupted)
+                return
+            
+            # A recent background refresh can be shown right away
+            cached_updates = self.update_manager.load_cached_updates()
+            if cached_updates is not None:
+                self._on_updates_found(cached_updates)
+                return
+            
             self.status_spinner.set_visible(True)
             self.status_spinner.start()
             self.status_label.set_markup(f"<b>{_('Searching for updates...')}</b>")
             self.refresh_button.set_sensitive(False)
             self.update_manager.refresh_updates()
     
+    def _show_resume_dialog(self, interrupted):
+        """Offer to finish an installation that was interrupted"""
+        dialog = Adw.MessageDialog.new(self.window)
+        dialog.set_heading(_("Installation Was Interrupted"))
+        dialog.set_body(
+            _("The last installation did not finish. {} of {} updates are still to be installed.\n\n"
+              "Resume the installation now?").format(len(interrupted['remaining']), len(interrupted['updates']))
+        )
+        dialog.add_response("discard", _("Discard"))
+        dialog.add_response("resume", _("Resume"))
+        dialog.set_response_appearance("resume", Adw.ResponseAppearance.SUGGESTED)
+        dialog.set_default_response("resume")
+        dialog.set_close_response("discard")
+        
+        dialog.connect("response", self._on_resume_dialog_response, interrupted)
+        dialog.present()
+    
+    def _on_resume_dialog_response(self, dialog, response, interrupted):
+        """Resume the interrupted installation or continue with a normal start"""
+        if response == "resume":
+            self.selected_updates = interrupted['remaining']
+            self._disable_controls()
+            self.update_manager.resume_install()
+        else:
+            self.update_manager.discard_interrupted_install()
+            self.show()
+    
     # Event handlers
     def _on_refresh_clicked(self, button):
         """Handle refresh button click"""
@@ -263,15 +259,11 @@ class MainWindow:
     
     def _on_select_all_clicked(self, button):
         """Handle select all button click"""
-        for row in self.list_store:
-            row[0] = True
-        self._update_selected_updates()
+        self.update_list.set_all_selected(True)
     
     def _on_select_none_clicked(self, button):
         """Handle select none button click"""
-        for row in self.list_store:
-            row[0] = False
-        self._update_selected_updates()
+        self.update_list.set_all_selected(False)
     
     def _on_install_clicked(self, button):
         """Handle install updates button click"""
@@ -296,32 +288,26 @@ class MainWindow:
         if response == "install":
             self._start_installation()
     
-    def _on_update_toggled(self, renderer, path):
-        """Handle update selection toggle"""
-        self.list_store[path][0] = not self.list_store[path][0]
-        self._update_selected_updates()
-    
     def _start_installation(self):
         """Start the installation process"""
         if not self.update_manager:
             return
-        # Disable all interactive elements during update
+        self._disable_controls()
+        self.update_manager.install_updates(self.selected_updates)
+    
+    def _disable_controls(self):
+        """Disable all interactive elements during update"""
         self.install_button.set_sensitive(False)
         self.refresh_button.set_sensitive(False)
         self.select_all_button.set_sensitive(False)
         self.select_none_button.set_sensitive(False)
-        self.tree_view.set_sensitive(False)
+        self.update_list.set_sensitive(False)
         self.progress_bar.set_visible(True)
         self.status_label.set_markup(f"<b>{_('Installing updates...')}</b>")
-        
-        self.update_manager.install_updates(self.selected_updates)
     
     def _update_selected_updates(self):
         """Update the list of selected updates"""
-        self.selected_updates = []
-        for row in self.list_store:
-            if row[0]:  # If selected
-                self.selected_updates.append(row[7])  # Update object
+        self.selected_updates = self.update_list.get_selected_updates()
         
         self.install_button.set_sensitive(len(self.selected_updates) > 0)
         
@@ -334,39 +320,32 @@ class MainWindow:
     # Update manager callbacks
     def _on_updates_found(self, updates):
         """Handle updates found event"""
-        self.list_store.clear()
+        # The update policy preselects updates, APT binaries are grouped by source package
+        self.update_list.set_updates(self.update_manager.group_updates(updates),
+                                     self.update_manager.select_updates(updates))
         
         # Check if no updates are available
         if not updates or len(updates) == 0:
-            self._show_no_updates_dialog()
+            # Background refreshes must not pop up dialogs
+            if self.window.get_visible():
+                self._show_no_updates_dialog()
             return
         
-        for update in updates:
-            self.list_store.append([
-                True,   # selected - all updates selected by default
-                update['name'],
-                update['current_version'],
-                update['new_version'],
-                update['source'].upper(),
-                update['type'].title(),
-                update.get('size', 'Unknown'),
-                update  # update object
-            ])
-        
-        # Update selected updates since all are selected by default
-        self._update_selected_updates()
-        
         # Update status
         if self.update_manager:
             counts = self.update_manager.get_update_count()
-            self.update_count_label.set_text(
-                _("Total: {} | APT: {} | Flatpak: {} | Security: {}").format(
-                    counts['total'], counts['apt'], counts['flatpak'], counts['security']
-                )
-            )
+            parts = [_("Total: {}").format(counts['total'])]
+            parts += [f"{label}: {counts.get(name, 0)}" for name, label in self.update_manager.get_sources()]
+            parts.append(_("Security: {}").format(counts['security']))
+            self.update_count_label.set_text(" | ".join(parts))
         else:
             self.update_count_label.set_text(_("No update manager available"))
     
+    def _on_updates_streamed(self, updates):
+        """Show updates while the refresh is still resolving their details"""
+        # Only new rows are preselected; the policy is logged once the refresh is complete
+        self.update_list.add_updates(updates, lambda new: self.update_manager.select_updates(new, quiet=True))
+    
     def _show_no_updates_dialog(self):
         """Show dialog when no updates are available"""
         dialog = Adw.MessageDialog.new(self.window)
@@ -381,8 +360,10 @@ class MainWindow:
     
     def _on_no_updates_dialog_response(self, dialog, response):
         """Handle no updates dialog response"""
-        # Close the application
-        if self.window.get_application():
+        # Close the application (only the window when running in the background)
+        if getattr(self.window.get_application(), 'background', False):
+            self.window.close()
+        elif self.window.get_application():
             self.window.get_application().quit()
         else:
             self.window.close()
@@ -394,7 +375,7 @@ class MainWindow:
         self.refresh_button.set_sensitive(True)
         self.select_all_button.set_sensitive(True)
         self.select_none_button.set_sensitive(True)
-        self.tree_view.set_sensitive(True)
+        self.update_list.set_sensitive(True)
         self.status_label.set_markup(f"<b>{_('Ready')}</b>")
     
     def _on_update_progress(self, progress, package_name):
@@ -402,21 +383,21 @@ class MainWindow:
         self.progress_bar.set_fraction(progress / 100.0)
         self.status_label.set_markup(f"<b>{_('Installing: {}').format(package_name)}</b>")
     
-    def _on_update_complete(self, success):
-        """Handle update complete event"""
+    def _on_update_complete(self, success, summary=None):
+        """Handle update complete event with the installation summary"""
         self.progress_bar.set_visible(False)
         # Re-enable all interactive elements
         self.install_button.set_sensitive(True)
         self.refresh_button.set_sensitive(True)
         self.select_all_button.set_sensitive(True)
         self.select_none_button.set_sensitive(True)
-        self.tree_view.set_sensitive(True)
+        self.update_list.set_sensitive(True)
         
         if success:
             self.status_label.set_markup(f"<b>{_('Updates installed successfully - Refreshing list...')}</b>")
             
             # Show success popup dialog
-            self._show_success_dialog()
+            self._show_success_dialog(summary)
             
             # Show notification
             notification = Notify.Notification.new(
@@ -436,7 +417,7 @@ class MainWindow:
             self.status_label.set_markup(f"<b>{_('Update installation failed')}</b>")
             
             # Show error popup dialog
-            self._show_error_dialog()
+            self._show_error_dialog(summary)
             
             # Show error notification
             notification = Notify.Notification.new(
@@ -445,6 +426,44 @@ class MainWindow:
                 "dialog-error"
             )
             notification.show()
+            
+            # Whatever did get installed drops out of the list
+            if summary and summary['installed']:
+                GLib.timeout_add_seconds(2, self._delayed_refresh)
+    
+    def _on_preflight_failed(self, report):
+        """Handle failed pre-flight checks, nothing has been downloaded yet"""
+        self.progress_bar.set_visible(False)
+        # Re-enable all interactive elements
+        self.install_button.set_sensitive(True)
+        self.refresh_button.set_sensitive(True)
+        self.select_all_button.set_sensitive(True)
+        self.select_none_button.set_sensitive(True)
+        self.update_list.set_sensitive(True)
+        self.status_label.set_markup(f"<b>{_('Updates cannot be installed')}</b>")
+        
+        problems = []
+        for space in report['low_space']:
+            problems.append(_("• Not enough disk space on {}: {} needed, {} available").format(
+                space['path'], GLib.format_size(space['required']), GLib.format_size(space['available'])
+            ))
+        if report['held']:
+            problems.append(_("• Held packages: {}").format(", ".join(report['held'])))
+        if report['removals']:
+            problems.append(_("• Packages that would be removed: {}").format(", ".join(report['removals'])))
+        for error in report['errors'][:5]:
+            problems.append(f"• {error}")
+        
+        dialog = Adw.MessageDialog.new(self.window)
+        dialog.set_heading(_("Updates Cannot Be Installed"))
+        dialog.set_body(
+            _("The installation was checked before downloading and would fail:") + "\n\n" +
+            "\n".join(problems)
+        )
+        dialog.add_response("ok", _("OK"))
+        dialog.set_default_response("ok")
+        
+        dialog.present()
     
     def _delayed_refresh(self):
         """Delayed refresh after successful updates"""
@@ -452,39 +471,86 @@ class MainWindow:
             self.update_manager.refresh_updates()
         return False  # Don't repeat
     
-    def _show_success_dialog(self):
+    def _show_success_dialog(self, summary=None):
         """Show success popup dialog after successful update"""
         # Get update count for the message
-        update_count = len(self.selected_updates)
+        update_count = summary['installed'] if summary else len(self.selected_updates)
         
         dialog = Adw.MessageDialog.new(self.window)
         dialog.set_heading(_("Updates Completed Successfully!"))
         dialog.set_body(
             _("{} updates have been installed successfully.\n\n"
-              "Your system is now up to date. Some updates may require "
-              "a system restart to take full effect.").format(update_count)
+              "Your system is now up to date.").format(update_count) + "\n\n" + self._restart_advice(summary)
         )
         dialog.add_response("ok", _("OK"))
         dialog.set_response_appearance("ok", Adw.ResponseAppearance.SUGGESTED)
         dialog.set_default_response("ok")
+        self._add_restart_response(dialog, summary)
         
         dialog.present()
     
-    def _show_error_dialog(self):
+    def _restart_advice(self, summary):
+        """Tell what the installed updates need to take effect"""
+        if not summary:
+            return _("Some updates may require a system restart to take full effect.")
+        if summary.get('reboot_packages'):
+            return _("Restart the computer to complete the update of: {}").format(
+                ", ".join(summary['reboot_packages'][:10]))
+        
+        advice = []
+        services = summary.get('restart_services', []) + summary.get('restart_user_services', [])
+        if services:
+            advice.append(_("These services still use the old libraries: {}").format(", ".join(services[:10])))
+        if summary.get('restart_programs'):
+            advice.append(_("Restart these programs to use the updated libraries: {}").format(
+                ", ".join(summary['restart_programs'][:10])))
+        return "\n\n".join(advice) or _("No restart is needed.")
+    
+    def _add_restart_response(self, dialog, summary):
+        """Offer to restart the services that still use replaced libraries"""
+        if not summary or summary.get('reboot_packages'):
+            return
+        if summary.get('restart_services') or summary.get('restart_user_services'):
+            dialog.add_response("restart-services", _("Restart Services"))
+            dialog.connect("response", self._on_restart_services_response, summary)
+    
+    def _on_restart_services_response(self, dialog, response, summary):
+        """Restart the services in one batch if the user asked for it"""
+        if response != "restart-services":
+            return
+        self.status_label.set_markup(f"<b>{_('Restarting services...')}</b>")
+        self.update_manager.restart_services(summary['restart_services'], summary['restart_user_services'])
+    
+    def _on_services_restarted(self, success):
+        """Handle services restarted event"""
+        if success:
+            self.status_label.set_markup(f"<b>{_('Services restarted')}</b>")
+        else:
+            self.status_label.set_markup(f"<b>{_('Some services could not be restarted')}</b>")
+    
+    def _show_error_dialog(self, summary=None):
         """Show error popup dialog after failed update"""
+        body = _("Some updates could not be installed successfully.\n\n"
+                 "This might be due to:\n"
+                 "• Network connection issues\n"
+                 "• Package conflicts\n"
+                 "• Insufficient disk space\n"
+                 "• Permission problems\n\n"
+                 "Please check the system logs for more details and try again.")
+        if summary and summary['failed']:
+            body = _("{} of {} updates were installed. Failed: {}").format(
+                summary['installed'], summary['total'], ", ".join(summary['failed'][:10])
+            ) + "\n\n" + body
+            if summary['installed']:
+                body += "\n\n" + self._restart_advice(summary)
+        
         dialog = Adw.MessageDialog.new(self.window)
         dialog.set_heading(_("Update Installation Failed!"))
-        dialog.set_body(
-            _("Some updates could not be installed successfully.\n\n"
-              "This might be due to:\n"
-              "• Network connection issues\n"
-              "• Package conflicts\n"
-              "• Insufficient disk space\n"
-              "• Permission problems\n\n"
-              "Please check the system logs for more details and try again.")
-        )
+        dialog.set_body(body)
         dialog.add_response("ok", _("OK"))
         dialog.set_response_appearance("ok", Adw.ResponseAppearance.DESTRUCTIVE)
         dialog.set_default_response("ok")
+        if summary and summary['installed']:
+            self._add_restart_response(dialog, summary)
         
         dialog.present()
\ No newline at end of file
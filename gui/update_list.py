@@ -0,0 +1,423 @@
+"""
+Update List for GuideOS Updater
+Sortable, filterable and searchable list of available updates, grouped by source package
+"""
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, Gio, GObject
+
+from utils.i18n import _, N_
+from core.restart_impact import REBOOT, strongest
+
+# Text columns of the update list: (title, item property, sort by property, minimum width)
+TEXT_COLUMNS = [
+    (N_("Package"), 'name', 'name', 200),
+    (N_("Current Version"), 'current-version', None, -1),
+    (N_("New Version"), 'new-version', None, -1),
+    (N_("Source"), 'source', 'source', -1),
+    (N_("Type"), 'kind', 'is-security', -1),
+    (N_("Size"), 'size', 'size-bytes', -1),
+    (N_("Restart"), 'restart', 'restart', -1),
+]
+
+# Quick filters shown next to the search entry: (filter id, label), one per source follows
+QUICK_FILTERS = [
+    ('all', N_("All")),
+    ('security', N_("Security")),
+]
+
+# Properties compared as numbers when sorting, everything else sorts as text
+NUMERIC_PROPERTIES = {'size-bytes', 'is-security'}
+
+def _update_key(update):
+    """Identify an update version; snapshots copy the records, so identity does not"""
+    return (update['source'], update['name'], update.get('architecture'), update['new_version'])
+
+def restart_label(update):
+    """Short text telling what an update needs to take effect"""
+    if update.get('restart') == REBOOT:
+        return _("Reboot")
+    programs = update.get('restart_programs') or []
+    return ", ".join(programs[:2]) + ("…" if len(programs) > 2 else "")
+
+class UpdateItem(GObject.Object):
+    """List model item wrapping one update record"""
+
+    __gtype_name__ = 'GuideOSUpdateItem'
+
+    # Child items of expandable rows
+    children = None
+
+    selected = GObject.Property(type=bool, default=True)
+    partial = GObject.Property(type=bool, default=False)
+    name = GObject.Property(type=str, default='')
+    current_version = GObject.Property(type=str, default='')
+    new_version = GObject.Property(type=str, default='')
+    source = GObject.Property(type=str, default='')
+    kind = GObject.Property(type=str, default='')
+    size = GObject.Property(type=str, default='')
+    size_bytes = GObject.Property(type=GObject.TYPE_INT64, default=-1)
+    is_security = GObject.Property(type=bool, default=False)
+    restart = GObject.Property(type=str, default='')
+
+    def __init__(self, update, selected=True):
+        super().__init__()
+        self.selected = selected
+        self.name = update['name']
+        self.current_version = update['current_version']
+        self.new_version = update['new_version']
+        self.source = update['source'].upper()
+        self.set_details(update)
+
+    def set_details(self, update):
+        """Show the details of the update record, which may arrive after the row"""
+        self.update = update
+        self.kind = update['type'].title()
+        # Archives already downloaded by an earlier run cost nothing to fetch
+        self.size = _("Downloaded") if update.get('cached') else update.get('size', 'Unknown')
+        # Unknown sizes sort before every known size
+        size_bytes = update.get('size_bytes')
+        self.size_bytes = size_bytes if size_bytes is not None else -1
+        self.is_security = update.get('is_security', False)
+        self.restart = restart_label(update)
+
+        # Index entries, built with the details so filtering never touches the update
+        # record or reads GObject properties
+        self.filter_keys = {'all', update['source']}
+        if self.is_security:
+            self.filter_keys.add('security')
+        self.search_key = ' '.join([
+            update['name'], update.get('app_id') or '', update.get('description') or '',
+            update['new_version'], update.get('origin') or ''
+        ]).lower()
+
+class UpdateGroup(UpdateItem):
+    """Expandable row for several updates, e.g. all binaries of one source package"""
+
+    __gtype_name__ = 'GuideOSUpdateGroup'
+
+    def __init__(self, group, is_selected):
+        items = [UpdateItem(update, is_selected(update)) for update in group['updates']]
+        count = sum(1 for item in items if item.selected)
+        first = group['updates'][0]
+        super().__init__(dict(
+            first,
+            name=group['name'],
+            type='security' if group['is_security'] else first['type'],
+            is_security=group['is_security'],
+            size=group['size'],
+            size_bytes=group['size_bytes'],
+            cached=group.get('cached', False),
+            restart=strongest(u.get('restart') for u in group['updates']),
+            restart_programs=sorted({p for u in group['updates'] for p in u.get('restart_programs', [])}),
+            description=''
+        ), count == len(items))
+        self.partial = 0 < count < len(items)
+        self.update = None
+        self._syncing = False
+
+        self.children = Gio.ListStore(item_type=UpdateItem)
+        self.children.splice(0, 0, items)
+
+        # The group matches whenever one of its updates does
+        for item in items:
+            self.filter_keys |= item.filter_keys
+            item.connect('notify::selected', self._on_child_selected)
+        self.search_key = '\n'.join([self.search_key] + [item.search_key for item in items])
+        self.connect('notify::selected', self._on_selected)
+
+    def _on_selected(self, group, pspec):
+        """Apply the group's check box to all of its updates"""
+        if self._syncing:
+            return
+        self._syncing = True
+        for item in self.children:
+            item.selected = self.selected
+        self.partial = False
+        self._syncing = False
+
+    def _on_child_selected(self, item, pspec):
+        """Show whether all, some or none of the group's updates are selected"""
+        if self._syncing:
+            return
+        count = sum(1 for child in self.children if child.selected)
+        self._syncing = True
+        self.selected = count == self.children.get_n_items()
+        self.partial = 0 < count < self.children.get_n_items()
+        self._syncing = False
+
+class UpdateList:
+    """Column view over a filtered and sorted tree of update items"""
+
+    def __init__(self, on_selection_changed=None):
+        self.on_selection_changed = on_selection_changed
+        self.query = ''
+        self.quick_filter = 'all'
+        self._bulk_change = False
+        self._bindings = {}
+        # Rows added by a running refresh by update, None once the refresh has ended
+        self._streamed = None
+
+        # store -> filter -> tree -> sort; the store is only replaced when new updates arrive
+        self.store = Gio.ListStore(item_type=UpdateItem)
+        self.filter = Gtk.CustomFilter.new(self._filter_item)
+        self.filter_model = Gtk.FilterListModel(model=self.store, filter=self.filter)
+        self.tree_model = Gtk.TreeListModel.new(self.filter_model, False, False, self._create_child_model)
+
+        self.column_view = Gtk.ColumnView()
+        self.column_view.set_show_column_separators(True)
+        # Groups are sorted among each other and their updates within the group
+        sorter = Gtk.TreeListRowSorter.new(self.column_view.get_sorter())
+        self.sort_model = Gtk.SortListModel(model=self.tree_model, sorter=sorter)
+        self.column_view.set_model(Gtk.NoSelection(model=self.sort_model))
+
+        self._create_columns()
+
+    def _create_columns(self):
+        """Create the selection and text columns"""
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_check_setup)
+        factory.connect('bind', self._on_check_bind)
+        factory.connect('unbind', self._on_check_unbind)
+        self.column_view.append_column(Gtk.ColumnViewColumn.new(_("Select"), factory))
+
+        # Text columns, titles are translated when the columns are built
+        for title, prop, sort_prop, min_width in TEXT_COLUMNS:
+            factory = Gtk.SignalListItemFactory()
+            if prop == 'name':
+                # Package names carry the expander of group rows
+                factory.connect('setup', self._on_expander_setup)
+                factory.connect('bind', self._on_expander_bind)
+            else:
+                factory.connect('setup', self._on_label_setup)
+                factory.connect('bind', self._on_label_bind, prop)
+                factory.connect('unbind', self._on_label_unbind)
+
+            column = Gtk.ColumnViewColumn.new(str(title), factory)
+            column.set_resizable(True)
+            if min_width > 0:
+                column.set_fixed_width(min_width)
+                column.set_expand(True)
+            if sort_prop:
+                column.set_sorter(self._create_sorter(sort_prop))
+            self.column_view.append_column(column)
+
+    def _create_sorter(self, prop):
+        """Sorter comparing an item property without calling back into Python"""
+        expression = Gtk.PropertyExpression.new(UpdateItem, None, prop)
+        if prop in NUMERIC_PROPERTIES:
+            return Gtk.NumericSorter.new(expression)
+        return Gtk.StringSorter.new(expression)
+
+    def create_filter_bar(self):
+        """Create the search entry and quick filter buttons"""
+        filter_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text(_("Search updates"))
+        self.search_entry.set_hexpand(True)
+        self.search_entry.connect('search-changed', self._on_search_changed)
+        filter_box.append(self.search_entry)
+
+        self._filter_buttons = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self._filter_buttons.add_css_class('linked')
+        self._filter_group = None
+        for filter_id, label in QUICK_FILTERS:
+            self._add_filter_button(filter_id, str(label))
+        self._source_buttons = []
+        filter_box.append(self._filter_buttons)
+
+        return filter_box
+
+    def set_sources(self, sources):
+        """Add a quick filter for each (name, label) update source"""
+        for button in self._source_buttons:
+            self._filter_buttons.remove(button)
+        self._source_buttons = [self._add_filter_button(name, label) for name, label in sources]
+
+    def _add_filter_button(self, filter_id, label):
+        """Add a quick filter button to the linked group"""
+        button = Gtk.ToggleButton.new_with_label(label)
+        button.set_active(filter_id == self.quick_filter)
+        if self._filter_group:
+            button.set_group(self._filter_group)
+        else:
+            self._filter_group = button
+        button.connect('toggled', self._on_quick_filter_toggled, filter_id)
+        self._filter_buttons.append(button)
+        return button
+
+    def set_updates(self, groups, selected=None):
+        """Replace the listed update groups in a single model change"""
+        is_selected = self._selection(selected)
+        self._streamed = None
+
+        items = []
+        for group in groups:
+            # Groups of one update are shown as plain rows
+            if len(group['updates']) == 1:
+                item = UpdateItem(group['updates'][0], is_selected(group['updates'][0]))
+            else:
+                item = UpdateGroup(group, is_selected)
+                for child in item.children:
+                    child.connect('notify::selected', self._on_item_selected)
+            item.connect('notify::selected', self._on_item_selected)
+            items.append(item)
+        self.store.splice(0, self.store.get_n_items(), items)
+        self._notify_selection_changed()
+
+    def add_updates(self, updates, select=None):
+        """Show updates of a running refresh as plain rows, or fill in the rows already shown
+
+        select(updates) preselects among the new rows; rows already shown keep their selection.
+        """
+        # The first batch of a refresh replaces the previous list
+        if self._streamed is None:
+            self._streamed = {}
+            self.store.remove_all()
+
+        new = []
+        for update in updates:
+            item = self._streamed.get(_update_key(update))
+            if item is not None:
+                item.set_details(update)
+            else:
+                new.append(update)
+
+        is_selected = self._selection(select(new) if select and new else None)
+        items = []
+        for update in new:
+            item = UpdateItem(update, is_selected(update))
+            item.connect('notify::selected', self._on_item_selected)
+            self._streamed[_update_key(update)] = item
+            items.append(item)
+        self.store.splice(self.store.get_n_items(), 0, items)
+        self._notify_selection_changed()
+
+    def _selection(self, selected):
+        """Check whether an update is preselected; all are if there is no preselection"""
+        chosen = None if selected is None else {_update_key(update) for update in selected}
+        return lambda update: chosen is None or _update_key(update) in chosen
+
+    def get_selected_updates(self):
+        """Selected updates, including those hidden by the current filter"""
+        selected = []
+        for item in self.store:
+            if item.children is None:
+                if item.selected:
+                    selected.append(item.update)
+            else:
+                selected.extend(child.update for child in item.children if child.selected)
+        return selected
+
+    def set_all_selected(self, selected):
+        """Select or deselect every update or group that is currently shown"""
+        self._bulk_change = True
+        try:
+            for item in self.filter_model:
+                item.selected = selected
+        finally:
+            self._bulk_change = False
+        self._notify_selection_changed()
+
+    def set_sensitive(self, sensitive):
+        """Enable or disable the list"""
+        self.column_view.set_sensitive(sensitive)
+
+    def _filter_item(self, item):
+        """Match an item against the quick filter and search query"""
+        return self.quick_filter in item.filter_keys and self.query in item.search_key
+
+    def _create_child_model(self, item):
+        """Child rows of a group, filtered like the top level"""
+        if item.children is None:
+            return None
+        return Gtk.FilterListModel(model=item.children, filter=self.filter)
+
+    def _on_search_changed(self, entry):
+        """Filter by the search text, re-checking only the rows that can change"""
+        query = entry.get_text().strip().lower()
+        if query == self.query:
+            return
+
+        if query.startswith(self.query):
+            change = Gtk.FilterChange.MORE_STRICT
+        elif self.query.startswith(query):
+            change = Gtk.FilterChange.LESS_STRICT
+        else:
+            change = Gtk.FilterChange.DIFFERENT
+        self.query = query
+        self.filter.changed(change)
+
+    def _on_quick_filter_toggled(self, button, filter_id):
+        """Switch the quick filter"""
+        if not button.get_active() or filter_id == self.quick_filter:
+            return
+
+        change = Gtk.FilterChange.MORE_STRICT if self.quick_filter == 'all' else Gtk.FilterChange.DIFFERENT
+        if filter_id == 'all':
+            change = Gtk.FilterChange.LESS_STRICT
+        self.quick_filter = filter_id
+        self.filter.changed(change)
+
+    def _on_item_selected(self, item, pspec):
+        """Handle a changed check box"""
+        if not self._bulk_change:
+            self._notify_selection_changed()
+
+    def _notify_selection_changed(self):
+        """Tell the window that the selection changed"""
+        if self.on_selection_changed:
+            self.on_selection_changed()
+
+    def _on_check_setup(self, factory, list_item):
+        """Create the check box of a row"""
+        list_item.set_child(Gtk.CheckButton())
+
+    def _on_check_bind(self, factory, list_item):
+        """Keep the check box and the item's selection in sync"""
+        check = list_item.get_child()
+        item = list_item.get_item().get_item()
+        self._bindings[check] = [
+            item.bind_property('selected', check, 'active',
+                               GObject.BindingFlags.BIDIRECTIONAL | GObject.BindingFlags.SYNC_CREATE),
+            item.bind_property('partial', check, 'inconsistent', GObject.BindingFlags.SYNC_CREATE)
+        ]
+
+    def _on_check_unbind(self, factory, list_item):
+        """Release the check box for another row"""
+        for binding in self._bindings.pop(list_item.get_child(), []):
+            binding.unbind()
+
+    def _on_expander_setup(self, factory, list_item):
+        """Create the expander and label of a package cell"""
+        label = Gtk.Label()
+        label.set_xalign(0)
+        expander = Gtk.TreeExpander()
+        expander.set_child(label)
+        list_item.set_child(expander)
+
+    def _on_expander_bind(self, factory, list_item):
+        """Show the package or source package name with the row's expander"""
+        expander = list_item.get_child()
+        row = list_item.get_item()
+        expander.set_list_row(row)
+        expander.get_child().set_text(row.get_item().name)
+
+    def _on_label_setup(self, factory, list_item):
+        """Create the label of a text cell"""
+        label = Gtk.Label()
+        label.set_xalign(0)
+        list_item.set_child(label)
+
+    def _on_label_bind(self, factory, list_item, prop):
+        """Show an item property in a text cell, following later changes like resolved sizes"""
+        label = list_item.get_child()
+        self._bindings[label] = [list_item.get_item().get_item().bind_property(
+            prop, label, 'label', GObject.BindingFlags.SYNC_CREATE)]
+
+    def _on_label_unbind(self, factory, list_item):
+        """Release the text cell for another row"""
+        for binding in self._bindings.pop(list_item.get_child(), []):
+            binding.unbind()
@@ -4,9 +4,15 @@ GuideOS Updater - GuideOS Update Manager
 A GUI update manager for APT and Flatpak packages, similar to mintupdate.
 """
 
-import gi
 import sys
 import os
+
+# Unattended runs have no display, so they are dispatched before GTK is imported
+if '--unattended' in sys.argv[1:]:
+    from core.unattended import main as unattended_main
+    sys.exit(unattended_main())
+
+import gi
 import threading
 import subprocess
 import json
@@ -17,18 +23,20 @@ gi.require_version('Adw', '1')
 gi.require_version('Notify', '0.7')
 from gi.repository import Gtk, Adw, GLib, Gio, Notify
 
-# Initialize internationalization first
+# Translations are loaded on first use, not at import
 from utils.i18n import _
 
 # Local imports
 from core.update_manager import UpdateManager
+from core.download_cache import DownloadCache
+from core.scheduler import RefreshScheduler
 from gui.main_window import MainWindow
 from utils.logger import Logger
 
 class GuideOSUpdaterApplication(Adw.Application):
     """Main application class for GuideOS Update Manager"""
     
-    def __init__(self):
+    def __init__(self, background=False):
         super().__init__(application_id="org.guideos.updater", flags=Gio.ApplicationFlags.FLAGS_NONE)
         self.logger = Logger()
         self.logger.info("Starting GuideOS Updater")
@@ -41,16 +49,48 @@ class GuideOSUpdaterApplication(Adw.Application):
         
         self.main_window = None
         self.update_manager = None
+        self.scheduler = None
+        self.cache_server = None
+        
+        # In background mode the window only opens when the app is launched again
+        self.background = background
+        self._skip_activate = background
+    
+    def do_startup(self):
+        """Called once when the primary instance starts"""
+        Adw.Application.do_startup(self)
+        
+        if self.background:
+            # Stay alive without a window and refresh on a timer
+            self.logger.info("Running in background mode")
+            self.hold()
+            self.update_manager = UpdateManager()
+            self.update_manager.add_callback('updates_found', self._on_background_updates_found)
+            self.scheduler = RefreshScheduler(self.update_manager)
+            self.scheduler.start()
+            
+            # Peers fetch archives from the shared cache while this instance keeps running
+            self.cache_server = DownloadCache().start_server()
     
     def do_activate(self):
         """Called when the application is activated"""
+        if self._skip_activate:
+            self._skip_activate = False
+            return
+        
         if not self.main_window:
             # Create main window first
             self.main_window = MainWindow(None)
             self.main_window.window.set_application(self)
             
             # Create update manager with window reference
-            self.update_manager = UpdateManager(self.main_window.window)
+            if self.update_manager:
+                self.update_manager.set_parent_window(self.main_window.window)
+            else:
+                self.update_manager = UpdateManager(self.main_window.window)
+            
+            # Keep the window around for the next launch when running in the background
+            self.main_window.window.set_hide_on_close(self.background)
             
             # Set the update manager in the main window
             self.main_window.set_update_manager(self.update_manager)
@@ -61,18 +101,42 @@ class GuideOSUpdaterApplication(Adw.Application):
         # Show the window
         self.main_window.show()
     
+    def _on_background_updates_found(self, updates):
+        """Notify about updates found while no window is shown"""
+        try:
+            from config import SHOW_NOTIFICATIONS
+        except ImportError:
+            SHOW_NOTIFICATIONS = True
+        
+        if not updates or not SHOW_NOTIFICATIONS:
+            return
+        if self.main_window and self.main_window.window.get_visible():
+            return
+        
+        notification = Notify.Notification.new(
+            _("Updates Available"),
+            _("{} updates are ready to be installed.").format(len(updates)),
+            "guidos-updater"
+        )
+        notification.show()
+    
     def do_shutdown(self):
         """Called when the application is shutting down"""
         self.logger.info("Shutting down GuideOS Updater")
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.cache_server:
+            self.cache_server.shutdown()
+            self.cache_server.server_close()
         Adw.Application.do_shutdown(self)
 
 def main():
     """Main entry point"""
     if os.getuid() == 0:
-        print("Error: Do not run this application as root")
+        print("Error: Do not run this application as root, except with --unattended")
         sys.exit(1)
     
-    app = GuideOSUpdaterApplication()
+    app = GuideOSUpdaterApplication(background='--background' in sys.argv[1:])
     return app.run(None)
 
 if __name__ == "__main__":
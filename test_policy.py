@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for loading malformed update policy files
+"""
+
+import json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.policy import UpdatePolicy, BLOCKED
+
+def load(tmp_path, content):
+    path = tmp_path / 'policy.json'
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    return UpdatePolicy.load(path)
+
+def update(name, first_seen=0):
+    return {'name': name, 'source': 'apt', 'new_version': '1.0', 'first_seen': first_seen}
+
+def test_missing_file_uses_defaults(tmp_path):
+    policy = UpdatePolicy.load(tmp_path / 'missing.json')
+    assert policy.rules == UpdatePolicy.DEFAULT_RULES
+
+def test_invalid_json_uses_defaults(tmp_path):
+    assert load(tmp_path, '{"delay_days": ').rules == UpdatePolicy.DEFAULT_RULES
+
+def test_top_level_must_be_an_object(tmp_path):
+    for content in ([], "firefox", 3):
+        assert load(tmp_path, content).rules == UpdatePolicy.DEFAULT_RULES
+
+def test_blocked_string_is_dropped(tmp_path):
+    policy = load(tmp_path, {'blocked': 'firefox'})
+    assert policy.rules['blocked'] == []
+    # Not matched character by character
+    assert policy.evaluate([update('f')]) == [None]
+
+def test_blocked_entries_must_be_strings(tmp_path):
+    assert load(tmp_path, {'blocked': ['firefox', 3]}).rules['blocked'] == []
+
+def test_non_numeric_rules_are_dropped(tmp_path):
+    policy = load(tmp_path, {'delay_days': '7', 'rollout_percentage': None})
+    assert policy.rules['delay_days'] == 0
+    assert policy.rules['rollout_percentage'] == 100
+    assert policy.evaluate([update('firefox')]) == [None]
+
+def test_numbers_out_of_range_are_dropped(tmp_path):
+    policy = load(tmp_path, {'delay_days': -1, 'rollout_percentage': 150})
+    assert policy.rules['delay_days'] == 0
+    assert policy.rules['rollout_percentage'] == 100
+
+def test_booleans_are_not_numbers(tmp_path):
+    policy = load(tmp_path, {'delay_days': True, 'security_only': 'yes'})
+    assert policy.rules['delay_days'] == 0
+    assert policy.rules['security_only'] is False
+
+def test_valid_rules_are_kept_next_to_invalid_ones(tmp_path):
+    policy = load(tmp_path, {'blocked': ['linux-image-*'], 'delay_days': 'soon', 'unknown': 1})
+    assert policy.rules['blocked'] == ['linux-image-*']
+    assert 'unknown' not in policy.rules
+    assert policy.evaluate([update('linux-image-6.1')]) == [BLOCKED]
@@ -62,11 +62,11 @@ if __name__ == "__main__":
     import time
     
     # Override get_updates methods
-    def mock_apt_updates(self):
+    def mock_apt_updates(self, update_cache=True, found=None):
         test_updates = create_test_updates()
         return [u for u in test_updates if u['source'] == 'apt']
     
-    def mock_flatpak_updates(self):
+    def mock_flatpak_updates(self, update_cache=True, found=None):
         test_updates = create_test_updates()
         return [u for u in test_updates if u['source'] == 'flatpak']
     
@@ -86,12 +86,12 @@ if __name__ == "__main__":
     # Create a tracking variable for installed packages
     installed_packages = set()
     
-    def mock_apt_updates_after_install(self):
+    def mock_apt_updates_after_install(self, update_cache=True, found=None):
         test_updates = create_test_updates()
         # Filter out installed packages
         return [u for u in test_updates if u['source'] == 'apt' and u['name'] not in installed_packages]
     
-    def mock_flatpak_updates_after_install(self):
+    def mock_flatpak_updates_after_install(self, update_cache=True, found=None):
         test_updates = create_test_updates()
         # Filter out installed packages
         return [u for u in test_updates if u['source'] == 'flatpak' and u['name'] not in installed_packages]
@@ -114,6 +114,7 @@ if __name__ == "__main__":
     APTManager.get_updates = mock_apt_updates_after_install
     FlatpakManager.get_updates = mock_flatpak_updates_after_install
     APTManager.install_update = mock_apt_install_with_tracking
+    APTManager.install_updates = lambda self, updates, progress=None: all([self.install_update(u) for u in updates])
     FlatpakManager.install_update = mock_flatpak_install_with_tracking
     
     print("Starting GUP with test data...")
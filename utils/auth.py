@@ -5,12 +5,15 @@ Authentication utilities for sudo operations
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Gdk', '4.0')
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, GLib, Gio
 import subprocess
 import threading
 from utils.logger import Logger
 from utils.i18n import _
 
+# Seconds a worker thread waits for the password before giving up
+AUTH_TIMEOUT = 300
+
 class SudoAuthenticator:
     """Handles sudo authentication with graphical password dialog"""
     
@@ -19,12 +22,65 @@ class SudoAuthenticator:
         self.logger = Logger()
         self._password = None
         self._authenticated = False
+        self._auth_lock = threading.Lock()
+        self._auth_callback = None
+        self._verifying = False
+        self._verify_timeout_id = None
     
     def authenticate(self, message=None):
-        """Show password dialog and authenticate with sudo"""
+        """Ask for the password on the main thread and wait for the result (worker threads only)"""
         if message is None:
             message = _("Administrator privileges required")
-        return self._show_password_dialog(message)
+        
+        if threading.current_thread() is threading.main_thread():
+            # Waiting here would block the main loop that runs the dialog
+            self.logger.error("authenticate() must not be called from the main thread, use authenticate_async()")
+            return False
+        
+        # Concurrent callers share one prompt
+        with self._auth_lock:
+            if self._authenticated:
+                return True
+            
+            done = threading.Event()
+            result = []
+            
+            def on_result(success):
+                result.append(success)
+                done.set()
+            
+            GLib.idle_add(self._start_authentication, message, on_result)
+            # Without a running main loop or with a forgotten dialog nobody ever answers
+            if not done.wait(AUTH_TIMEOUT):
+                self.logger.error("Timed out waiting for the password")
+                GLib.idle_add(self._cancel_authentication, on_result)
+                return False
+            return result[0]
+    
+    def authenticate_async(self, message, callback):
+        """Show the password dialog and call callback(success) once verified (main thread only)"""
+        self._start_authentication(message, callback)
+    
+    def _start_authentication(self, message, callback):
+        """Show the password dialog; the result is delivered through callback"""
+        self._auth_callback = callback
+        self._show_password_dialog(message)
+        return False
+    
+    def _cancel_authentication(self, callback):
+        """Close the dialog of an authentication the caller stopped waiting for"""
+        if self._auth_callback is callback:
+            self._auth_callback = None
+            dialog = getattr(self, 'dialog', None)
+            if dialog is not None:
+                dialog.destroy()
+        return False
+    
+    def _finish_authentication(self, success):
+        """Deliver the authentication result exactly once"""
+        callback, self._auth_callback = self._auth_callback, None
+        if callback:
+            callback(success)
     
     def _show_password_dialog(self, message):
         """Show GTK password dialog"""
@@ -116,31 +172,25 @@ class SudoAuthenticator:
         key_controller.connect("key-released", self._on_key_released)
         self.password_entry.add_controller(key_controller)
         
-        # Store result
-        self.auth_result = False
-        self.auth_password = None
+        # Closing the dialog without a password cancels the authentication
+        dialog.connect("close-request", self._on_dialog_close_request)
+        dialog.connect("destroy", self._on_dialog_close_request)
         
         dialog.present()
-        
-        # Run modal loop
-        loop = GLib.MainLoop()
-        self.main_loop = loop
-        dialog.connect("close-request", lambda w: loop.quit())
-        loop.run()
-        
-        if self.auth_password:
-            return self._verify_password(self.auth_password)
-        
+    
+    def _on_dialog_close_request(self, dialog):
+        """Handle the password dialog being closed or destroyed"""
+        if not self._verifying:
+            self._finish_authentication(False)
         return False
     
     def _on_authenticate_clicked(self, button):
         """Handle authenticate button click"""
         password = self.password_entry.get_text()
         if password:
-            self.auth_password = password
+            self._verifying = True
             self.dialog.close()
-            if hasattr(self, 'main_loop'):
-                self.main_loop.quit()
+            self._verify_password(password)
     
     def _on_key_pressed(self, controller, keyval, keycode, state):
         """Handle key press events"""
@@ -161,36 +211,50 @@ class SudoAuthenticator:
         return False
     
     def _verify_password(self, password):
-        """Verify the sudo password"""
+        """Verify the sudo password without blocking the main loop"""
         try:
-            # Test sudo access with the provided password
-            process = subprocess.Popen(
-                ['sudo', '-S', 'true'],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+            # Test sudo access with the provided password, ignoring cached credentials
+            process = Gio.Subprocess.new(
+                ['sudo', '-k', '-S', '-p', '', 'true'],
+                Gio.SubprocessFlags.STDIN_PIPE |
+                Gio.SubprocessFlags.STDOUT_SILENCE |
+                Gio.SubprocessFlags.STDERR_SILENCE
             )
-            
-            stdout, stderr = process.communicate(input=password + '\n', timeout=10)
-            
-            if process.returncode == 0:
-                self.logger.info("Sudo authentication successful")
-                self._password = password
-                self._authenticated = True
-                return True
-            else:
-                self.logger.warning("Sudo authentication failed")
-                self._show_auth_error()
-                return False
-                
-        except subprocess.TimeoutExpired:
-            self.logger.error("Sudo authentication timed out")
-            process.kill()
-            return False
+            self._verify_timeout_id = GLib.timeout_add_seconds(10, self._on_verify_timeout, process)
+            process.communicate_utf8_async(password + '\n', None, self._on_verify_finished, password)
         except Exception as e:
             self.logger.error(f"Error during sudo authentication: {e}")
-            return False
+            self._verifying = False
+            self._finish_authentication(False)
+    
+    def _on_verify_timeout(self, process):
+        """Stop a password check that takes too long"""
+        self.logger.error("Sudo authentication timed out")
+        self._verify_timeout_id = None
+        process.force_exit()
+        return False
+    
+    def _on_verify_finished(self, process, result, password):
+        """Handle the finished password check"""
+        self._verifying = False
+        if self._verify_timeout_id is not None:
+            GLib.source_remove(self._verify_timeout_id)
+            self._verify_timeout_id = None
+        
+        try:
+            process.communicate_utf8_finish(result)
+        except Exception as e:
+            self.logger.error(f"Error during sudo authentication: {e}")
+        
+        if process.get_if_exited() and process.get_exit_status() == 0:
+            self.logger.info("Sudo authentication successful")
+            self._password = password
+            self._authenticated = True
+            self._finish_authentication(True)
+        else:
+            self.logger.warning("Sudo authentication failed")
+            self._show_auth_error()
+            self._finish_authentication(False)
     
     def _show_auth_error(self):
         """Show authentication error dialog"""
@@ -2,55 +2,64 @@
 Internationalization support for GuideOS Updater
 """
 
-import gettext
 import os
-import locale
+
+DOMAIN = 'guideos-updater'
+
+_translation = None
 
 # Detect locale directory
 def get_locale_dir():
     """Get the appropriate locale directory"""
+    import gettext
+
     # First try system-wide installation
     system_locale_dir = '/usr/share/locale'
-    if os.path.exists(system_locale_dir):
+    if gettext.find(DOMAIN, system_locale_dir):
         return system_locale_dir
-    
+
     # Fallback to local directory for development
     script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     local_locale_dir = os.path.join(script_dir, 'locale')
-    return local_locale_dir
-
-LOCALE_DIR = get_locale_dir()
-
-# Set up gettext
-def setup_i18n():
-    """Initialize internationalization"""
-    try:
-        # Try to get system locale
-        current_locale = locale.getdefaultlocale()[0]
-        if current_locale is None:
-            current_locale = 'en_US'
-        
-        # Set up gettext
-        translation = gettext.translation(
-            'guideos-updater', 
-            localedir=LOCALE_DIR, 
-            languages=[current_locale, 'en'], 
-            fallback=True
-        )
-        translation.install()
-        
-        # Make _ available globally
-        import builtins
-        builtins._ = translation.gettext
-        
-        return translation.gettext
-    except Exception as e:
-        # Fallback: no translation
-        def _(text):
-            return text
-        import builtins
-        builtins._ = _
-        return _
-
-# Initialize on import
-_ = setup_i18n()
\ No newline at end of file
+    if os.path.isdir(local_locale_dir):
+        return local_locale_dir
+    return system_locale_dir
+
+def get_translation():
+    """Load the message catalog, once and only when the first message is translated"""
+    global _translation
+    if _translation is None:
+        import gettext
+
+        # gettext picks the language from LANGUAGE, LC_ALL, LC_MESSAGES and LANG itself
+        _translation = gettext.translation(DOMAIN, localedir=get_locale_dir(), fallback=True)
+    return _translation
+
+def _(message):
+    """Translate a message"""
+    return get_translation().gettext(message)
+
+class LazyString:
+    """Message that is translated when it is first rendered"""
+
+    __slots__ = ('message', '_translated')
+
+    def __init__(self, message):
+        self.message = message
+        self._translated = None
+
+    def __str__(self):
+        if self._translated is None:
+            self._translated = _(self.message)
+        return self._translated
+
+    def __repr__(self):
+        return f"N_({self.message!r})"
+
+    def format(self, *args, **kwargs):
+        """Translate and format the message"""
+        return str(self).format(*args, **kwargs)
+
+def N_(message):
+    """Mark a message for translation without loading the catalog yet"""
+    return LazyString(message)
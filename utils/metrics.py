@@ -0,0 +1,147 @@
+"""
+Metrics for GUP Update Manager
+Refresh and install statistics in the Prometheus textfile collector format
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from utils.logger import Logger
+
+PREFIX = 'guideos_updater_'
+
+# name: (type, help)
+METRICS = {
+    'refresh_duration_seconds': ('gauge', 'Duration of the last update check per source'),
+    'last_refresh_timestamp_seconds': ('gauge', 'Time of the last completed update check'),
+    'pending_updates': ('gauge', 'Available updates per source'),
+    'pending_security_updates': ('gauge', 'Available security updates'),
+    'install_duration_seconds': ('gauge', 'Duration of the last installation'),
+    'install_updates': ('gauge', 'Updates selected for the last installation'),
+    'install_failures': ('gauge', 'Updates that failed to install in the last installation'),
+    'last_install_timestamp_seconds': ('gauge', 'Time of the last completed installation'),
+    'unattended_peak_memory_bytes': ('gauge', 'Peak memory of the last unattended run'),
+    'process_spawns_total': ('counter', 'Processes started by the updater per program'),
+}
+
+_spawns = {}
+_spawns_lock = threading.Lock()
+_spawn_hook_installed = False
+
+def _count_spawns(event, args):
+    """Audit hook counting subprocesses by program name"""
+    if event != 'subprocess.Popen':
+        return
+    executable, command = args[0], args[1]
+    if not executable:
+        executable = command[0] if isinstance(command, (list, tuple)) else str(command).split(' ', 1)[0]
+    program = os.path.basename(os.fsdecode(executable))
+    with _spawns_lock:
+        _spawns[program] = _spawns.get(program, 0) + 1
+
+def install_spawn_counter():
+    """Count every subprocess this process starts; audit hooks stay for the process lifetime"""
+    global _spawn_hook_installed
+    if not _spawn_hook_installed:
+        sys.addaudithook(_count_spawns)
+        _spawn_hook_installed = True
+
+def _escape(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """In-memory gauges written as one .prom file (and an optional JSON summary)"""
+
+    def __init__(self, directory=None, json_summary=None):
+        self.logger = Logger()
+
+        try:
+            from config import LOG_DIR, METRICS_ENABLED, METRICS_JSON_SUMMARY
+        except ImportError:
+            LOG_DIR = Path.home() / '.local' / 'share' / 'gup'
+            METRICS_ENABLED = True
+            METRICS_JSON_SUMMARY = False
+
+        self.enabled = METRICS_ENABLED
+        directory = Path(directory) if directory else LOG_DIR
+        self.prom_file = directory / 'guideos-updater.prom'
+        if json_summary is None:
+            json_summary = METRICS_JSON_SUMMARY
+        self.json_file = directory / 'metrics.json' if json_summary else None
+        self._values = {}
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            install_spawn_counter()
+
+    def set(self, name, value, **labels):
+        """Set a gauge, labels distinguish series of the same metric"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Record the duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set(name, round(time.perf_counter() - start, 3), **labels)
+
+    def record_pending(self, counts):
+        """Record pending update counts as returned by UpdateManager.get_update_count"""
+        for source, count in counts.items():
+            if source not in ('total', 'security'):
+                self.set('pending_updates', count, source=source)
+        self.set('pending_security_updates', counts.get('security', 0))
+
+    def collect(self):
+        """Get all series as {name: {labels: value}}, including process spawns"""
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+        with _spawns_lock:
+            values['process_spawns_total'] = {(('program', program),): count
+                                              for program, count in _spawns.items()}
+        return values
+
+    def write(self):
+        """Write the metrics files; cheap enough to call after every refresh or install"""
+        if not self.enabled:
+            return
+
+        values = self.collect()
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = values.get(name)
+            if not series:
+                continue
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in sorted(series.items()):
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"{PREFIX}{name}{{{label_text}}} {value}" if label_text
+                             else f"{PREFIX}{name} {value}")
+
+        try:
+            # The textfile collector may read at any time, so replace the file atomically
+            self._replace(self.prom_file, '\n'.join(lines) + '\n')
+            if self.json_file:
+                summary = {name: [dict(labels, value=value) for labels, value in sorted(series.items())]
+                           for name, series in values.items()}
+                self._replace(self.json_file, json.dumps({'timestamp': time.time(), 'metrics': summary}))
+        except OSError as e:
+            self.logger.warning(f"Could not write metrics: {e}")
+
+    def _replace(self, path, content):
+        """Write a file through a temporary file in the same directory"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f'.{path.name}.tmp')
+        with open(temporary, 'w') as f:
+            f.write(content)
+        temporary.replace(path)
@@ -125,11 +125,27 @@ class PolicyKitManager:
         except Exception as e:
             return False, str(e)
     
-    def install_packages(self, packages):
+    def configure_pending_packages(self):
+        """Finish configuring packages after an interrupted dpkg run using PolicyKit"""
+        try:
+            cmd = ['pkexec', 'dpkg', '--configure', '-a']
+            result = subprocess.run(cmd,
+                                  capture_output=True,
+                                  text=True,
+                                  timeout=300)
+            
+            if result.returncode == 0:
+                return True, result.stdout
+            else:
+                return False, result.stderr
+        except Exception as e:
+            return False, str(e)
+    
+    def install_packages(self, packages, options=None):
         """Install packages using PolicyKit"""
         try:
             # Simple pkexec without action-id for broader compatibility
-            cmd = ['pkexec', 'apt', 'install', '-y'] + packages
+            cmd = ['pkexec', 'apt', 'install', '-y'] + (options or []) + packages
             result = subprocess.run(cmd,
                                   capture_output=True, 
                                   text=True,
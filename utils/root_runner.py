@@ -0,0 +1,31 @@
+"""
+Privileged commands for processes already running as root
+"""
+
+import os
+import subprocess
+from utils.logger import Logger
+
+class RootRunner:
+    """Runs privileged commands directly, in place of the sudo password dialog"""
+
+    def __init__(self):
+        self.logger = Logger()
+        self.parent_window = None
+
+    def run_sudo_command(self, command):
+        """Run a command as the current (root) user"""
+        # Nobody is there to answer debconf questions
+        env = dict(os.environ, DEBIAN_FRONTEND='noninteractive')
+        try:
+            result = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True,
+                                  text=True, env=env)
+            if result.returncode == 0:
+                return True, result.stdout
+            return False, result.stderr
+        except Exception as e:
+            self.logger.error(f"Error running command: {e}")
+            return False, str(e)
+
+    def clear_credentials(self):
+        """Nothing to clear, no password is involved"""